@@ -0,0 +1,461 @@
+# benchmark.py
+# Benchmarks the pipeline's hot paths on a synthetic corpus.
+#
+#   python benchmark.py --scale 1k                  # all stages, JSON to stdout
+#   python benchmark.py --scale 10k --output run.json
+#   python benchmark.py --stage chunk --cases 500   # one stage
+#   python benchmark.py --compare old.json new.json
+#   python benchmark.py --check-imports             # fail if a module imports slowly
+#
+# Every stage runs in its own subprocess so peak RSS is per stage; rss_delta_mb
+# is the growth of the peak while the stage is timed, excluding the synthetic
+# inputs. Gemini, Neo4j and indiankanoon.org are replaced by local stand-ins;
+# Chroma runs in memory, the corpus store in a temporary directory, and the
+# embedder is a hashing stand-in unless --real-model is given. The Neo4j
+# stand-in only serializes each query's parameters, so neo4j_load times the
+# client-side cost; a fixed simulated round trip per transaction is reported
+# next to it (p50_with_round_trip_ms) rather than slept. Every stage makes one
+# untimed warm-up call first, so lazy loads (tokenizer, model) are not timed.
+import os
+import sys
+import csv
+import json
+import gzip
+import math
+import time
+import zlib
+import random
+import itertools
+import platform
+import argparse
+import resource
+import subprocess
+from datetime import datetime
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+EMBED_DIM = 384  # all-MiniLM-L6-v2
+QUERIES = 200
+NEO4J_ROUND_TRIP_MS = 0.5  # simulated server round trip per write transaction
+
+# Importing any script must stay cheap: heavy resources are built lazily (resources.py)
+IMPORT_BUDGET_MS = 150
+IMPORT_MODULES = ["scraper", "getIDs", "dataset", "cleaning", "preprocessing", "build_vector_store",
+                  "neo", "hybrid_search", "citations", "pipeline", "metrics", "resources",
+                  "dedup", "corpus_store"]
+
+# -------------------------
+# Synthetic corpus
+# -------------------------
+VOCAB = (
+    "the court appellant respondent petitioner held that section act order decree "
+    "judgment appeal maintenance divorce wife husband evidence magistrate sessions "
+    "high bombay learned counsel submitted impugned application criminal civil code "
+    "procedure desertion cruelty custody alimony marriage hindu provision sub-section "
+    "clause record finding trial issue question law fact dismissed allowed remanded"
+).split()
+JUDGES = ["Hon'ble Justice S.P. Bharucha", "Justice M.L. Pendse", "Mr. Justice A.V. Savant",
+          "Hon'ble Dr. Justice B.P. Saraf", "Smt. Justice Sujata Manohar", "Shri Justice H.H. Kantharia"]
+COURTS = ["Bombay High Court", "Supreme Court of India", "Delhi High Court"]
+REPORTERS = ["BOMCR", "CRILJ", "MHLJ", "AIR", "SCC"]
+
+def synthetic_judgment(rng, words=1500):
+    sentences, n = [], 0
+    while n < words:
+        length = rng.randint(8, 30)
+        sentences.append(" ".join(rng.choice(VOCAB) for _ in range(length)).capitalize() + ".")
+        n += length
+    return " ".join(sentences)
+
+def synthetic_row(rng, i):
+    """One row shaped like extracted_cases.csv (see dataset.columns)."""
+    year = rng.randint(1950, 2020)
+    return {
+        "File Name": f"{1000000 + i}.txt",
+        "Case Title": f"{rng.choice(VOCAB).title()} vs {rng.choice(VOCAB).title()}",
+        "Court Name": rng.choice(COURTS),
+        "Date of Judgment": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{year}",
+        "Case Number": f"Civil Appeal No. {i} of {year}",
+        "Judges": ", ".join(rng.sample(JUDGES, rng.randint(1, 3))),
+        "Petitioner(s)": rng.choice(VOCAB).title(),
+        "Respondent(s)": rng.choice(VOCAB).title(),
+        "Legal Issues": synthetic_judgment(rng, 25),
+        "Decision Summary": synthetic_judgment(rng, 60),
+        "Outcome": rng.choice(["Appeal allowed.", "Appeal dismissed.", "Rules made absolute."]),
+        "Citations": ", ".join(f"{year}({rng.randint(1, 4)}){rng.choice(REPORTERS)}{rng.randint(1, 999)}"
+                               for _ in range(rng.randint(0, 3))),
+    }
+
+def synthetic_chunk(rng, row, i=0):
+    """One record shaped like cases_chunks.jsonl."""
+    return {
+        "id": f"{row['File Name']}__chunk_{i}",
+        "text": synthetic_judgment(rng, 500),
+        "metadata": {
+            "file_name": row["File Name"],
+            "case_title": row["Case Title"],
+            "court": row["Court Name"],
+            "case_number": row["Case Number"],
+            "date": "-".join(reversed(row["Date of Judgment"].split("-"))),
+            "judges": row["Judges"],
+            "petitioner": row["Petitioner(s)"],
+            "respondent": row["Respondent(s)"],
+            "legal_issues": row["Legal Issues"],
+            "outcome": row["Outcome"],
+            "citations": row["Citations"],
+            "local_path": "",
+        },
+    }
+
+def write_corpus(out_dir, n_cases, seed=0):
+    """Materialize a synthetic corpus_text/ store, extracted_cases.csv and cases_chunks.jsonl."""
+    from corpus_store import CorpusStore
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    rows = [synthetic_row(rng, i) for i in range(n_cases)]
+    with open(os.path.join(out_dir, "extracted_cases.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(out_dir, "cases_chunks.jsonl"), "w", encoding="utf-8") as f, \
+            CorpusStore(os.path.join(out_dir, "corpus_text")) as store:
+        for row in rows:
+            store.put(row["File Name"], synthetic_judgment(rng))
+            f.write(json.dumps(synthetic_chunk(rng, row), ensure_ascii=False) + "\n")
+
+# -------------------------
+# Local stand-ins
+# -------------------------
+class FakeResponse:
+    """Minimal requests.Response: gzip body, and .text that is not yet decoded HTML."""
+    def __init__(self, html, encoded=True):
+        self.encoding = "utf-8"
+        if encoded:
+            self.content = gzip.compress(html.encode("utf-8"))
+            self.headers = {"Content-Encoding": "gzip"}
+            self.text = self.content.decode("latin-1").replace("<", "").replace(">", "")
+        else:
+            self.content = html.encode("utf-8")
+            self.headers = {}
+            self.text = html
+
+class HashingEmbedder:
+    """Stands in for SentenceTransformer.encode with deterministic bag-of-words vectors."""
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        import numpy as np
+        out = np.zeros((len(texts), EMBED_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                out[row, zlib.crc32(word.encode("utf-8")) % EMBED_DIM] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-9)
+
+class FakeTransaction:
+    """Encodes each statement like the driver would put it on the wire, without a server."""
+    def __init__(self):
+        self.statements = 0
+        self.bytes_sent = 0
+    def run(self, query, parameters=None, **kwargs):
+        self.statements += 1
+        payload = json.dumps({"query": query, "parameters": dict(parameters or {}, **kwargs)}, default=str)
+        self.bytes_sent += len(payload.encode("utf-8"))
+
+class FakeSession:
+    """Stands in for a neo4j Session: execute_write runs the function on a fake tx."""
+    def __init__(self):
+        self.tx = FakeTransaction()
+    def execute_write(self, func, *args, **kwargs):
+        return func(self.tx, *args, **kwargs)
+
+def fake_gemini_response(rng):
+    row = synthetic_row(rng, rng.randint(0, 10**6))
+    del row["File Name"]
+    return "```json\n" + json.dumps(row) + "\n```"
+
+# -------------------------
+# Stages
+# -------------------------
+def stage_decode(n, rng):
+    from scraper import get_decoded_html
+    responses = [FakeResponse(f"<html><body>{synthetic_judgment(rng)}</body></html>", encoded=i % 2 == 0)
+                 for i in range(n)]
+    return ((get_decoded_html, (r,)) for r in responses)
+
+def _synthetic_store(n, rng):
+    import atexit
+    import shutil
+    import tempfile
+    from corpus_store import CorpusStore
+    root = tempfile.mkdtemp(prefix="ipd-bench-")
+    atexit.register(shutil.rmtree, root, True)
+    store = CorpusStore(root)
+    for i in range(n):
+        store.put(f"{1000000 + i}.txt", synthetic_judgment(rng))
+    store.flush()
+    return store
+
+def stage_corpus_get(n, rng):
+    store = _synthetic_store(n, rng)
+    ids = store.ids()
+    rng.shuffle(ids)
+    return ((store.get, (doc_id,)) for doc_id in ids)
+
+def stage_corpus_scan(n, rng):
+    store = _synthetic_store(n, rng)
+    return [(lambda: sum(1 for _ in store.items()), ())]
+
+def stage_clean_judges(n, rng):
+    from cleaning import clean_judge_names
+    names = [synthetic_row(rng, i)["Judges"] for i in range(n)]
+    return ((clean_judge_names, (name,)) for name in names)
+
+def stage_chunk(n, rng):
+    from preprocessing import chunk_text_by_tokens
+    texts = [synthetic_judgment(rng) for _ in range(n)]
+    return ((chunk_text_by_tokens, (text, 700, 120)) for text in texts)
+
+def stage_extract(n, rng):
+    import dataset
+    responses = [fake_gemini_response(rng) for _ in range(n)]
+    it = itertools.cycle(responses)  # the warm-up call takes one extra response
+    dataset.call_gemini = lambda prompt, retries=3: next(it)
+    texts = [synthetic_judgment(rng) for _ in range(n)]
+    return ((dataset.extract_case_info, (text,)) for text in texts)
+
+def _embedder(real_model):
+    if real_model:
+        from resources import get_model
+        return get_model()
+    return HashingEmbedder()
+
+def _chunks(n, rng):
+    return [synthetic_chunk(rng, synthetic_row(rng, i)) for i in range(n)]
+
+def stage_embed(n, rng, real_model=False, batch_size=32):
+    model = _embedder(real_model)
+    texts = [d["text"] for d in _chunks(n, rng)]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    return ((model.encode, (batch,), {"batch_size": batch_size}) for batch in batches)
+
+def _memory_collection(name="bench"):
+    import chromadb
+    client = chromadb.EphemeralClient()
+    return client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+
+def stage_chroma_add(n, rng, real_model=False, batch_size=256):
+    import build_vector_store
+    collection = _memory_collection()
+    model = _embedder(real_model)
+    docs = _chunks(n, rng)
+    batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+    # warm up on a throwaway collection: re-adding the same ids would be a no-op
+    warmup = (build_vector_store.add_chunks, (_memory_collection("bench_warmup"), model, batches[0], False))
+    return itertools.chain([warmup], ((build_vector_store.add_chunks, (collection, model, batch, False))
+                                      for batch in batches))
+
+def stage_chroma_query(n, rng, real_model=False):
+    import build_vector_store
+    collection = _memory_collection()
+    model = _embedder(real_model)
+    docs = _chunks(n, rng)
+    for i in range(0, len(docs), 1000):
+        build_vector_store.add_chunks(collection, model, docs[i:i + 1000], False)
+    queries = [model.encode([synthetic_judgment(rng, 12)]).tolist() for _ in range(QUERIES)]
+    return ((collection.query, (), {"query_embeddings": q, "n_results": 15}) for q in queries)
+
+def stage_neo4j_load(n, rng):
+    from neo import create_case_graph
+    session = FakeSession()
+    rows = [synthetic_row(rng, i) for i in range(n)]
+    return ((session.execute_write, (create_case_graph, row)) for row in rows)
+
+STAGES = {
+    "decode": stage_decode,
+    "corpus_get": stage_corpus_get,
+    "corpus_scan": stage_corpus_scan,
+    "clean_judges": stage_clean_judges,
+    "chunk": stage_chunk,
+    "extract": stage_extract,
+    "embed": stage_embed,
+    "chroma_add": stage_chroma_add,
+    "chroma_query": stage_chroma_query,
+    "neo4j_load": stage_neo4j_load,
+}
+MODEL_STAGES = {"embed", "chroma_add", "chroma_query"}
+# Stages whose first call is their own warm-up (it would not be repeatable)
+SELF_WARMED = {"chroma_add"}
+# Reported with the result of stages that time a stand-in instead of the real service
+STAND_INS = {"neo4j_load": "fake session: client-side cost of building and JSON-encoding each write"}
+ROUND_TRIP_MS = {"neo4j_load": NEO4J_ROUND_TRIP_MS}
+
+# -------------------------
+# Measurement
+# -------------------------
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank percentile
+    k = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_stage(name, n_cases, seed=0, real_model=False):
+    """Time every call of one stage; returns a JSON-serializable result."""
+    rng = random.Random(seed)
+    factory = STAGES[name]
+    calls = factory(n_cases, rng, real_model) if name in MODEL_STAGES else factory(n_cases, rng)
+    calls = [c if len(c) == 3 else (c[0], c[1], {}) for c in calls]
+    # one untimed call, so one-off lazy loads do not land in the first sample
+    func, args, kwargs = calls[0]
+    func(*args, **kwargs)
+    if name in SELF_WARMED:
+        calls = calls[1:]
+    baseline_rss = peak_rss_mb()  # after building the synthetic inputs
+
+    latencies = []
+    start = time.perf_counter()
+    for func, args, kwargs in calls:
+        t0 = time.perf_counter()
+        func(*args, **kwargs)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    latencies.sort()
+    peak_rss = peak_rss_mb()
+
+    result = {
+        "stage": name,
+        "cases": n_cases,
+        "calls": len(latencies),
+        "total_s": round(total, 6),
+        "throughput_cases_per_s": round(n_cases / total, 2) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "peak_rss_mb": round(peak_rss, 1),
+        "rss_delta_mb": round(peak_rss - baseline_rss, 1),
+    }
+    if name in STAND_INS:
+        result["stand_in"] = STAND_INS[name]
+    if name in ROUND_TRIP_MS:
+        # one simulated server round trip per call (write transaction), not slept
+        rt = ROUND_TRIP_MS[name]
+        result["simulated_round_trip_ms"] = rt
+        result["p50_with_round_trip_ms"] = round(result["p50_ms"] + rt, 4)
+        result["throughput_with_round_trip_cases_per_s"] = round(
+            n_cases / (total + len(latencies) * rt / 1000.0), 2) if latencies else None
+    return result
+
+def run_isolated(name, n_cases, seed, real_model):
+    cmd = [sys.executable, os.path.abspath(__file__), "--stage", name,
+           "--cases", str(n_cases), "--seed", str(seed)]
+    if real_model:
+        cmd.append("--real-model")
+    proc = subprocess.run(cmd, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        err = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"stage": name, "cases": n_cases, "error": err}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def import_time_ms(module):
+    """Wall time of a cold `import module` in a fresh interpreter, in milliseconds."""
+    code = ("import time; t = time.perf_counter(); import {}; "
+            "print((time.perf_counter() - t) * 1000)").format(module)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ["import failed"])[-1])
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def check_imports(budget_ms=IMPORT_BUDGET_MS):
+    """Print per-module import times as JSON; returns False if any is over budget."""
+    results, ok = [], True
+    for module in IMPORT_MODULES:
+        try:
+            ms = import_time_ms(module)
+            over = ms > budget_ms
+            results.append({"module": module, "import_ms": round(ms, 2), "over_budget": over})
+        except RuntimeError as e:
+            over = True
+            results.append({"module": module, "error": str(e), "over_budget": over})
+        ok = ok and not over
+    print(json.dumps({"budget_ms": budget_ms, "results": results}, indent=2))
+    return ok
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(old_path, new_path):
+    """Print throughput and latency ratios between two benchmark reports."""
+    with open(old_path) as f:
+        old = {r["stage"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["stage"]: r for r in json.load(f)["results"]}
+    print(f"{'stage':<14}{'throughput':>12}{'p50':>10}{'p99':>10}")
+    for stage, r in new.items():
+        o = old.get(stage)
+        if not o or "error" in o or "error" in r:
+            continue
+        ratio = lambda key: (r[key] / o[key]) if o[key] else float("nan")
+        print(f"{stage:<14}{ratio('throughput_cases_per_s'):>11.2f}x"
+              f"{ratio('p50_ms'):>9.2f}x{ratio('p99_ms'):>9.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IPD pipeline hot paths.")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--cases", type=int, help="override the number of cases")
+    parser.add_argument("--stage", choices=STAGES, action="append",
+                        help="run only these stages (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--real-model", action="store_true",
+                        help="use the real SentenceTransformer instead of the hashing stand-in")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--write-corpus", metavar="DIR",
+                        help="only write a synthetic corpus to DIR and exit")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--check-imports", action="store_true",
+                        help=f"fail if importing any script takes over {IMPORT_BUDGET_MS}ms")
+    args = parser.parse_args()
+
+    if args.check_imports:
+        sys.exit(0 if check_imports() else 1)
+
+    n_cases = args.cases or SCALES[args.scale]
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.write_corpus:
+        write_corpus(args.write_corpus, n_cases, args.seed)
+        return
+    # a single stage is run in-process (this is what the isolated runner calls)
+    if args.stage and len(args.stage) == 1:
+        print(json.dumps(run_stage(args.stage[0], n_cases, args.seed, args.real_model)))
+        return
+
+    results = [run_isolated(name, n_cases, args.seed, args.real_model)
+               for name in (args.stage or STAGES)]
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": n_cases,
+        "seed": args.seed,
+        "real_model": args.real_model,
+        "results": results,
+    }
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,63 @@
 # build_vector_store.py  (Chroma version)
 import json
-from sentence_transformers import SentenceTransformer
-import chromadb
+import argparse
+import metrics
+import citations
+from resources import get_collection, get_model, PERSIST_DIR
 
 CHUNKS_FILE = "cases_chunks.jsonl"
-PERSIST_DIR = "chroma_index"  # folder where Chroma stores the DB
-
-# 1. Load chunks
-docs = []
-with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
-    for line in f:
-        docs.append(json.loads(line))
-
-print(f"Loaded {len(docs)} chunks from {CHUNKS_FILE}")
-
-# 2. Embedding model
-print("Loading embedding model...")
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-# 3. Init Chroma
-client = chromadb.PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(
-    name="legal_cases",
-    metadata={"hnsw:space": "cosine"}  # cosine similarity
-)
-
-# 4. Insert documents
-print("Adding documents to Chroma...")
-texts = [d["text"] for d in docs]
-metadatas = [d["metadata"] for d in docs]
-ids = [d["id"] for d in docs]
-
-# Compute embeddings
-embeddings = model.encode(texts, batch_size=32, show_progress_bar=True).tolist()
-
-collection.add(
-    documents=texts,
-    metadatas=metadatas,
-    ids=ids,
-    embeddings=embeddings
-)
-
-print(f"Stored {collection.count()} chunks in ChromaDB at {PERSIST_DIR}")
+
+def load_chunks(path=CHUNKS_FILE):
+    docs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            docs.append(json.loads(line))
+    return docs
+
+def add_chunks(collection, model, docs, show_progress_bar=True):
+    """Embed chunk documents and add them to the collection."""
+    texts = [d["text"] for d in docs]
+    # carry over authority scores computed by citations.py, which only
+    # rewrites chunk metadata for cases whose scores changed
+    scores = citations.load_scores()
+    metadatas = [dict(d["metadata"], **scores.get(d["metadata"].get("case_number"), {})) for d in docs]
+    ids = [d["id"] for d in docs]
+
+    # Compute embeddings
+    with metrics.timer("embed_seconds"):
+        embeddings = model.encode(texts, batch_size=32, show_progress_bar=show_progress_bar).tolist()
+    metrics.incr("chunks_embedded_total", len(texts))
+
+    with metrics.timer("chroma_add_seconds"):
+        collection.add(
+            documents=texts,
+            metadatas=metadatas,
+            ids=ids,
+            embeddings=embeddings
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed the case chunks into ChromaDB.")
+    parser.add_argument("--chunks", default=CHUNKS_FILE, help="JSONL file of chunks")
+    args = parser.parse_args()
+
+    # 1. Load chunks
+    docs = load_chunks(args.chunks)
+    print(f"Loaded {len(docs)} chunks from {args.chunks}")
+
+    # 2. Embedding model
+    print("Loading embedding model...")
+    model = get_model()
+
+    # 3. Init Chroma
+    collection = get_collection()
+
+    # 4. Insert documents
+    print("Adding documents to Chroma...")
+    with metrics.profile("build_vector_store"):
+        add_chunks(collection, model, docs)
+
+    print(f"Stored {collection.count()} chunks in ChromaDB at {PERSIST_DIR}")
+
+if __name__ == "__main__":
+    main()
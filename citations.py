@@ -0,0 +1,289 @@
+# citations.py
+# Turns the free-text `Citations` field into (:Case)-[:CITES]->(:Case) edges and
+# precomputes per-case authority scores (PageRank + in-degree). Scores are written
+# back to Neo4j node properties and to the Chroma chunk metadata so query-time
+# ranking can use them without running graph algorithms per request.
+#
+# The job is incremental: each judgment's own citations (keyed by the corpus
+# store's sha1 of its text), the edges and the last written scores are kept in
+# STATE_FILE, and only cases whose edges or scores changed are written back.
+# Delete STATE_FILE to force a full rebuild.
+import os
+import re
+import csv
+import argparse
+import json
+import metrics
+from resources import get_collection, get_driver, get_text_store
+
+CSV_PATH = "extracted_cases_clean.csv"
+STATE_FILE = "citation_state.json"
+
+DAMPING = 0.85
+MAX_ITER = 100
+TOLERANCE = 1e-8
+# Scores are written back when the authority moves by more than this fraction
+# of the last written value; PageRank's teleport term shifts every score a
+# little whenever cases are added, which is not worth rewriting every node for.
+SCORE_TOLERANCE = 0.02
+WRITE_BATCH = 500
+
+# Indian Kanoon's "[Cites 3, Cited by 0]" counters end up in the Citations field
+COUNTER_RE = re.compile(r"\b(?:cites|cited\s+by)\s*\d+", re.IGNORECASE)
+# Header line of a scraped judgment listing the case's own reporter citations
+EQUIVALENT_RE = re.compile(r"^\W*equivalent citations?\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+# -------------------------
+# Parsing
+# -------------------------
+def normalize_citation(citation):
+    """'1992 (2) Bom CR 560' and '1992(2)BOMCR560' both become '19922BOMCR560'."""
+    return re.sub(r"[^0-9A-Z]", "", str(citation).upper())
+
+def split_citations(field):
+    """Split a Citations cell into normalized, de-duplicated citation keys."""
+    if not field:
+        return []
+    keys = []
+    for part in re.split(r"[,;\n]+", COUNTER_RE.sub("", str(field))):
+        key = normalize_citation(part)
+        # every reporter citation carries a year or volume/page number
+        if len(key) >= 4 and re.search(r"\d", key) and key not in keys:
+            keys.append(key)
+    return keys
+
+def own_citations(text):
+    """The case's own reporter citations from the 'Equivalent citations:' line of its text."""
+    match = EQUIVALENT_RE.search(text or "")
+    return split_citations(match.group(1)) if match else []
+
+def parse_case(row, own_keys=()):
+    """
+    Extract what the citation graph needs from one cleaned CSV row.
+
+    `own_keys` are the case's own reporter citations (own_citations() of its
+    scraped text); they are added to the identifiers other cases can cite it by.
+    """
+    case_number = (row.get("Case Number") or "").strip()
+    # a case can be cited by (any of) its case numbers or its own reporter citations
+    aliases = [normalize_citation(n) for n in case_number.split(",") if n.strip()]
+    aliases += [key for key in own_keys if key not in aliases]
+    return {
+        "case_number": case_number,
+        "date": (row.get("Date of Judgment") or "").strip(),
+        "keys": [key for key in split_citations(row.get("Citations")) if key not in aliases],
+        "aliases": aliases,
+    }
+
+# -------------------------
+# Graph construction
+# -------------------------
+def resolve_edges(cases):
+    """
+    Map every case to the list of cases it cites.
+
+    A citation key only resolves to a case it identifies (one of its case
+    numbers or its own reporter citations); keys pointing at judgments
+    outside the corpus are dropped.
+    """
+    owners = {}
+    for case in cases.values():
+        for alias in case["aliases"]:
+            owners[alias] = case["case_number"]
+
+    edges = {}
+    for case_number, case in cases.items():
+        cited = []
+        for key in case["keys"]:
+            target = owners.get(key)
+            if target and target != case_number and target not in cited:
+                cited.append(target)
+        edges[case_number] = cited
+    return edges
+
+def pagerank(edges, previous=None):
+    """Power-iteration PageRank, warm-started from previous scores when available."""
+    nodes = list(edges)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    previous = previous or {}
+    ranks = {v: previous.get(v, 1.0 / n) for v in nodes}
+    total = sum(ranks.values())
+    ranks = {v: r / total for v, r in ranks.items()}
+
+    for _ in range(MAX_ITER):
+        dangling = sum(ranks[v] for v in nodes if not edges[v])
+        base = (1.0 - DAMPING) / n + DAMPING * dangling / n
+        new_ranks = dict.fromkeys(nodes, base)
+        for v in nodes:
+            targets = edges[v]
+            if targets:
+                share = DAMPING * ranks[v] / len(targets)
+                for t in targets:
+                    new_ranks[t] += share
+        delta = sum(abs(new_ranks[v] - ranks[v]) for v in nodes)
+        ranks = new_ranks
+        if delta < TOLERANCE:
+            break
+    return ranks
+
+def authority_scores(edges, previous=None):
+    """PageRank, in-degree and a [0, 1] authority score (PageRank / max PageRank)."""
+    ranks = pagerank(edges, previous)
+    in_degree = dict.fromkeys(edges, 0)
+    for targets in edges.values():
+        for t in targets:
+            in_degree[t] += 1
+    top = max(ranks.values(), default=0.0) or 1.0
+    return {
+        v: {"pagerank": ranks[v], "cited_by": in_degree[v], "authority": ranks[v] / top}
+        for v in edges
+    }
+
+# -------------------------
+# State
+# -------------------------
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"own_citations": {}, "edges": {}, "scores": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def load_scores(path=STATE_FILE):
+    """{case_number: authority fields} from the last run, for stamping new chunks."""
+    if not os.path.exists(path):
+        return {}
+    return load_state(path)["scores"]
+
+def load_own_citations(file_names, previous):
+    """
+    {file_name: {"sha1", "keys"}} with the own reporter citations of each
+    judgment. Entries in `previous` are reused while the stored text's sha1 is
+    unchanged, so only new or re-scraped judgments are read from the store.
+    """
+    store = get_text_store()
+    digests = store.digests()
+    own = {}
+    for file_name in file_names:
+        digest = digests.get(file_name)
+        cached = previous.get(file_name)
+        if cached is None or cached["sha1"] != digest:
+            keys = own_citations(store.get(file_name)) if digest else []
+            cached = {"sha1": digest, "keys": keys}
+        own[file_name] = cached
+    return own
+
+def load_cases(own, csv_file=CSV_PATH):
+    """Parse the CSV; `own` is load_own_citations() for its file names."""
+    cases = {}
+    with open(csv_file, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = own.get(row.get("File Name") or "")
+            case = parse_case(row, entry["keys"] if entry else ())
+            if case["case_number"]:
+                cases.setdefault(case["case_number"], case)
+    return cases
+
+def read_file_names(csv_file=CSV_PATH):
+    with open(csv_file, encoding="utf-8") as f:
+        return [row.get("File Name") or "" for row in csv.DictReader(f)]
+
+def score_changed(old, new):
+    """Compare against the last written score (see SCORE_TOLERANCE)."""
+    if old is None:
+        return True
+    drift = abs(old["authority"] - new["authority"])
+    return old["cited_by"] != new["cited_by"] or drift > SCORE_TOLERANCE * old["authority"]
+
+def batches(items, size=WRITE_BATCH):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# -------------------------
+# Write-back
+# -------------------------
+def replace_citation_edges(tx, rows):
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (a:Case {case_number: row.case_number})-[r:CITES]->()
+        DELETE r
+    """, rows=rows)
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (a:Case {case_number: row.case_number})
+        UNWIND row.cites AS cited
+        MATCH (b:Case {case_number: cited})
+        MERGE (a)-[:CITES]->(b)
+    """, rows=rows)
+
+def write_authority(tx, rows):
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (c:Case {case_number: row.case_number})
+        SET c.pagerank = row.pagerank,
+            c.cited_by = row.cited_by,
+            c.authority = row.authority
+    """, rows=rows)
+
+def update_chroma_metadata(collection, scores):
+    """Merge authority fields into the metadata of every chunk of the given cases."""
+    for batch in batches(list(scores)):
+        found = collection.get(where={"case_number": {"$in": batch}}, include=["metadatas"])
+        if not found["ids"]:
+            continue
+        metadatas = []
+        for metadata in found["metadatas"]:
+            metadata = dict(metadata)
+            metadata.update(scores[metadata["case_number"]])
+            metadatas.append(metadata)
+        collection.update(ids=found["ids"], metadatas=metadatas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build citation edges and authority scores.")
+    parser.add_argument("--csv", default=CSV_PATH, help="cleaned case CSV")
+    parser.add_argument("--state-file", default=STATE_FILE,
+                        help="edges and scores from the last run (delete to force a full rebuild)")
+    args = parser.parse_args()
+
+    state = load_state(args.state_file)
+    own = load_own_citations(read_file_names(args.csv), state.get("own_citations", {}))
+    cases = load_cases(own, args.csv)
+    new_cases = [c for c in cases if c not in state["edges"]]
+    print(f"Loaded {len(cases)} cases ({len(new_cases)} new since last run).")
+
+    edges = resolve_edges(cases)
+    changed_edges = [c for c in cases if edges[c] != state["edges"].get(c)]
+    previous = {c: s["pagerank"] for c, s in state["scores"].items()}
+    with metrics.profile("citation_pagerank"):
+        scores = authority_scores(edges, previous)
+    changed_scores = {c: s for c, s in scores.items() if score_changed(state["scores"].get(c), s)}
+    print(f"{sum(map(len, edges.values()))} citation edges; "
+          f"{len(changed_edges)} cases with new edges, {len(changed_scores)} with new scores.")
+
+    with get_driver().session() as session:
+        for batch in batches(changed_edges):
+            with metrics.timer("neo4j_write_seconds", query="replace_citation_edges"):
+                session.execute_write(replace_citation_edges,
+                                      [{"case_number": c, "cites": edges[c]} for c in batch])
+        for batch in batches(list(changed_scores)):
+            with metrics.timer("neo4j_write_seconds", query="write_authority"):
+                session.execute_write(write_authority,
+                                      [dict(case_number=c, **changed_scores[c]) for c in batch])
+
+    update_chroma_metadata(get_collection(), changed_scores)
+
+    # keep the last written score of unchanged cases, so slow drift is still caught
+    written = {c: state["scores"].get(c, s) for c, s in scores.items()}
+    written.update(changed_scores)
+    save_state({"own_citations": own, "edges": edges, "scores": written}, args.state_file)
+    print(f"✅ Citation graph and authority scores updated ({args.state_file}).")
+
+if __name__ == "__main__":
+    main()
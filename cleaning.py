@@ -1,5 +1,6 @@
-import pandas as pd
 import re
+import argparse
+import math
 from datetime import datetime
 
 INPUT_CSV = "extracted_cases.csv"
@@ -10,9 +11,13 @@ JUDGE_PREFIXES = [
     r"Hon'?ble", r"Justice", r"Mr\.", r"Ms\.", r"Mrs\.", r"Shri", r"Smt\.", r"Dr\."
 ]
 
+def is_missing(value):
+    """Empty or NaN (how pandas reads blank CSV cells)."""
+    return not value or (isinstance(value, float) and math.isnan(value))
+
 def standardize_date(date_str):
     """Convert various date formats to YYYY-MM-DD."""
-    if not date_str or pd.isna(date_str):
+    if is_missing(date_str):
         return ""
     for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%B %d, %Y", "%d %B %Y"):
         try:
@@ -23,7 +28,7 @@ def standardize_date(date_str):
 
 def clean_judge_names(name_str):
     """Remove honorifics and extra spaces from judge names."""
-    if not name_str or pd.isna(name_str):
+    if is_missing(name_str):
         return ""
     cleaned = name_str
     for prefix in JUDGE_PREFIXES:
@@ -32,7 +37,14 @@ def clean_judge_names(name_str):
     return cleaned
 
 def main():
-    df = pd.read_csv(INPUT_CSV)
+    parser = argparse.ArgumentParser(description="Clean the extracted case CSV.")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    df = pd.read_csv(args.input)
 
     # 1️⃣ Date cleaning
     df["Date of Judgment"] = df["Date of Judgment"].apply(standardize_date)
@@ -47,8 +59,8 @@ def main():
     df = df.drop_duplicates(subset=["Case Number", "Court Name", "Date of Judgment"])
 
     # Save cleaned dataset
-    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
-    print(f"✅ Cleaned data saved to {OUTPUT_CSV}")
+    df.to_csv(args.output, index=False, encoding="utf-8")
+    print(f"✅ Cleaned data saved to {args.output}")
 
 if __name__ == "__main__":
     main()
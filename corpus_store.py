@@ -0,0 +1,350 @@
+# corpus_store.py
+# Sharded, append-only, compressed store for raw judgment text / HTML.
+#
+# Replaces one-file-per-judgment directories (scrappedText/*.txt, data/*.html):
+# records are compressed (zstd when `zstandard` is installed, gzip otherwise)
+# and appended to large segment files; index.jsonl maps each document ID to
+# its segment, offset and length for random access. Rewriting a document
+# appends a new record (the latest index entry wins), deleting it appends a
+# tombstone, and compact() rewrites only the live records.
+#
+#   python corpus_store.py migrate scrappedText corpus_text           # *.txt
+#   python corpus_store.py migrate data corpus_html --pattern "*.html"
+#   python corpus_store.py stats corpus_text
+#   python corpus_store.py cat corpus_text 1052109.txt
+import os
+import sys
+import glob
+import gzip
+import json
+import shutil
+import struct
+import hashlib
+import argparse
+
+SEGMENT_SIZE = 256 * 1024 * 1024   # start a new segment after this many bytes
+INDEX_FILE = "index.jsonl"
+SEGMENT_PATTERN = "segment-{:06d}.seg"
+
+# Record header: magic, codec, id length, payload length; then id, then payload.
+# Headers make segments self-describing, so the index can be rebuilt by a scan.
+_HEADER = struct.Struct("<4sBHI")
+_MAGIC = b"IPDR"
+CODEC_TOMBSTONE = 0  # empty record marking a deleted document
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+
+# optional zstd support
+try:
+    import zstandard
+    _HAS_ZSTD = True
+except Exception:
+    _HAS_ZSTD = False
+
+def _compress(data, codec):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+def _decompress(data, codec):
+    if codec == CODEC_ZSTD:
+        if not _HAS_ZSTD:
+            raise RuntimeError("Record is zstd-compressed. Install 'zstandard' (pip install zstandard).")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class CorpusStore:
+    """
+    Append-only document store in `root`.
+
+    Supports `doc_id in store`, len(store), get(doc_id) for random access and
+    items() for sequential streaming in segment order. Not safe for multiple
+    concurrent writers.
+    """
+    def __init__(self, root, segment_size=SEGMENT_SIZE, codec=None):
+        self.root = root
+        self.segment_size = segment_size
+        self.codec = codec or (CODEC_ZSTD if _HAS_ZSTD else CODEC_GZIP)
+        os.makedirs(root, exist_ok=True)
+        self.index = {}          # doc_id -> {"seg", "off", "len", "codec", "sha1"}
+        self._readers = {}       # seg number -> open file
+        self._writer = None
+        self._index_writer = None
+        self._load_index()
+
+    # -------------------------
+    # Index
+    # -------------------------
+    def _load_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            if self._segments():
+                self.rebuild_index()
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line from an interrupted write
+                if entry.get("deleted"):
+                    self.index.pop(entry["id"], None)
+                else:
+                    self.index[entry["id"]] = entry
+
+    def _segments(self):
+        return sorted(int(os.path.basename(p)[8:14])
+                      for p in glob.glob(os.path.join(self.root, "segment-*.seg")))
+
+    def _segment_path(self, seg):
+        return os.path.join(self.root, SEGMENT_PATTERN.format(seg))
+
+    def _scan_segment(self, seg):
+        """Yield (doc_id, entry) for every record in a segment, in file order."""
+        with open(self._segment_path(seg), "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                magic, codec, id_len, length = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    return  # torn record at the end of the segment
+                doc_id = f.read(id_len).decode("utf-8")
+                payload_off = offset + _HEADER.size + id_len
+                f.seek(length, os.SEEK_CUR)
+                offset = payload_off + length
+                yield doc_id, {"id": doc_id, "seg": seg, "off": payload_off, "len": length, "codec": codec}
+
+    def rebuild_index(self):
+        """Recreate index.jsonl by scanning every segment (latest record wins)."""
+        self.index = {}
+        for seg in self._segments():
+            for doc_id, entry in self._scan_segment(seg):
+                if entry["codec"] == CODEC_TOMBSTONE:
+                    self.index.pop(doc_id, None)
+                else:
+                    self.index[doc_id] = entry
+        for entry in self.index.values():
+            entry["sha1"] = hashlib.sha1(self._read(entry)).hexdigest()
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for entry in self.index.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(path + ".tmp", path)
+
+    # -------------------------
+    # Reading
+    # -------------------------
+    def __contains__(self, doc_id):
+        return doc_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def ids(self):
+        return list(self.index)
+
+    def digests(self):
+        """{doc_id: sha1 of the stored bytes} in store order, without reading any document."""
+        live = sorted(self.index.values(), key=lambda e: (e["seg"], e["off"]))
+        return {entry["id"]: entry["sha1"] for entry in live}
+
+    def _reader(self, seg):
+        f = self._readers.get(seg)
+        if f is None:
+            f = self._readers[seg] = open(self._segment_path(seg), "rb")
+        return f
+
+    def _read(self, entry):
+        if self._writer is not None and entry["seg"] == self._writer_seg:
+            self._writer.flush()  # the record may still be in the write buffer
+        f = self._reader(entry["seg"])
+        f.seek(entry["off"])
+        payload = f.read(entry["len"])
+        if len(payload) != entry["len"]:
+            raise IOError(f"Truncated record for {entry['id']} in {self._segment_path(entry['seg'])}")
+        return _decompress(payload, entry["codec"])
+
+    def get_bytes(self, doc_id):
+        return self._read(self.index[doc_id])
+
+    def get(self, doc_id, default=None):
+        """Document text, or `default` if the ID is not stored."""
+        entry = self.index.get(doc_id)
+        if entry is None:
+            return default
+        return self._read(entry).decode("utf-8")
+
+    def items(self):
+        """Stream (doc_id, text) for every live document, reading segments sequentially."""
+        live = sorted(self.index.values(), key=lambda e: (e["seg"], e["off"]))
+        for entry in live:
+            yield entry["id"], self._read(entry).decode("utf-8")
+
+    def uri(self, doc_id):
+        """Stable reference to a stored document (used as chunk `local_path`)."""
+        return f"corpus://{os.path.abspath(self.root)}/{doc_id}"
+
+    # -------------------------
+    # Writing
+    # -------------------------
+    def _open_writer(self, size_hint):
+        if self._writer is not None:
+            if self._writer.tell() + size_hint <= self.segment_size:
+                return self._writer
+            self._writer.flush()
+            os.fsync(self._writer.fileno())  # a full segment is never written again
+            self._writer.close()
+            seg = self._writer_seg + 1
+        else:
+            segments = self._segments()
+            seg = segments[-1] if segments else 0
+            if segments and os.path.getsize(self._segment_path(seg)) + size_hint > self.segment_size:
+                seg += 1
+        self._writer = open(self._segment_path(seg), "ab")
+        self._writer_seg = seg
+        return self._writer
+
+    def _append_index(self, entry):
+        if self._index_writer is None:
+            self._index_writer = open(os.path.join(self.root, INDEX_FILE), "a", encoding="utf-8")
+        self._index_writer.write(json.dumps(entry) + "\n")
+
+    def put(self, doc_id, text):
+        """Store `text` (str or bytes) under `doc_id`; returns False if it was already stored unchanged."""
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        digest = hashlib.sha1(data).hexdigest()
+        current = self.index.get(doc_id)
+        if current is not None and current.get("sha1") == digest:
+            return False
+
+        payload = _compress(data, self.codec)
+        seg, off = self._append_record(doc_id, self.codec, payload)
+        entry = {"id": doc_id, "seg": seg, "off": off, "len": len(payload),
+                 "codec": self.codec, "sha1": digest}
+        self._append_index(entry)
+        self.index[doc_id] = entry
+        return True
+
+    def _append_record(self, doc_id, codec, payload):
+        """Write one record; returns (segment, payload offset)."""
+        key = doc_id.encode("utf-8")
+        f = self._open_writer(_HEADER.size + len(key) + len(payload))
+        start = f.tell()
+        f.write(_HEADER.pack(_MAGIC, codec, len(key), len(payload)))
+        f.write(key)
+        f.write(payload)
+        return self._writer_seg, start + _HEADER.size + len(key)
+
+    def delete(self, doc_id):
+        if doc_id in self.index:
+            # tombstone in the segment too, so rebuild_index() does not resurrect it
+            self._append_record(doc_id, CODEC_TOMBSTONE, b"")
+            self._append_index({"id": doc_id, "deleted": True})
+            del self.index[doc_id]
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+        if self._index_writer is not None:
+            self._index_writer.flush()
+
+    def sync(self):
+        """flush() and fsync the open segment and index, so writes survive a crash."""
+        self.flush()
+        for f in (self._writer, self._index_writer):
+            if f is not None:
+                os.fsync(f.fileno())
+
+    def close(self):
+        self.flush()
+        for f in [self._writer, self._index_writer, *self._readers.values()]:
+            if f is not None:
+                f.close()
+        self._writer = self._index_writer = None
+        self._readers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def compact(self):
+        """Rewrite live records into fresh segments, dropping overwritten and deleted ones."""
+        tmp_root = self.root.rstrip("/\\") + ".compact"
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        with CorpusStore(tmp_root, self.segment_size, self.codec) as fresh:
+            for doc_id, text in self.items():
+                fresh.put(doc_id, text)
+        self.close()
+        old_root = self.root.rstrip("/\\") + ".old"
+        os.replace(self.root, old_root)
+        os.replace(tmp_root, self.root)
+        shutil.rmtree(old_root)
+        self.index = {}
+        self._load_index()
+
+# -------------------------
+# Migration
+# -------------------------
+def migrate(src_dir, store_dir, pattern="*.txt", delete=False):
+    """Copy every `pattern` file of src_dir into the store (document ID = file name)."""
+    added = skipped = 0
+    paths = sorted(glob.glob(os.path.join(src_dir, pattern)))
+    with CorpusStore(store_dir) as store:
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            if store.put(os.path.basename(path), data):
+                added += 1
+            else:
+                skipped += 1
+        store.sync()
+    # only remove sources once every record is durably on disk
+    if delete:
+        for path in paths:
+            os.remove(path)
+    print(f"✅ Migrated {src_dir} -> {store_dir}: {added} added, {skipped} already present.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage a sharded corpus store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="import a directory of files into a store")
+    m.add_argument("src_dir")
+    m.add_argument("store_dir")
+    m.add_argument("--pattern", default="*.txt")
+    m.add_argument("--delete", action="store_true", help="remove source files after import")
+    s = sub.add_parser("stats", help="document count and on-disk size")
+    s.add_argument("store_dir")
+    c = sub.add_parser("cat", help="print one document")
+    c.add_argument("store_dir")
+    c.add_argument("doc_id")
+    k = sub.add_parser("compact", help="drop overwritten and deleted records")
+    k.add_argument("store_dir")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.src_dir, args.store_dir, args.pattern, args.delete)
+    elif args.command == "stats":
+        store = CorpusStore(args.store_dir)
+        size = sum(os.path.getsize(os.path.join(args.store_dir, f)) for f in os.listdir(args.store_dir))
+        print(json.dumps({"documents": len(store), "segments": len(store._segments()),
+                          "bytes": size}))
+    elif args.command == "cat":
+        text = CorpusStore(args.store_dir).get(args.doc_id)
+        if text is None:
+            sys.exit(f"{args.doc_id} not found in {args.store_dir}")
+        print(text)
+    elif args.command == "compact":
+        with CorpusStore(args.store_dir) as store:
+            store.compact()
+
+if __name__ == "__main__":
+    main()
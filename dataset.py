@@ -1,21 +1,13 @@
-import os
-import glob
 import csv
+import argparse
 import json
 import re
 import time
-import google.generativeai as genai
-from dotenv import load_dotenv
+import metrics
+# Gemini is configured on first use from GEMINI_API_KEY (see resources.py)
+from resources import get_gemini_model, require_text_store
 
-# Load environment variables
-load_dotenv()
-
-# Configure Gemini
-# genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-genai.configure(api_key="")
-
-# Input & output paths
-INPUT_DIR = "scrappedText"
+# Input (corpus store, see corpus_store.py) & output paths
 OUTPUT_CSV = "extracted_cases.csv"
 
 # CSV columns
@@ -31,18 +23,24 @@ def chunk_text(text, chunk_size=50000):
 
 def call_gemini(prompt, retries=3):
     """Call Gemini API with retries."""
-    model = genai.GenerativeModel("gemini-2.0-flash-lite")
+    model = get_gemini_model()
     for attempt in range(retries):
         try:
-            response = model.generate_content(prompt)
+            with metrics.timer("gemini_call_seconds"):
+                response = model.generate_content(prompt)
             return response.text
         except Exception as e:
             print(f"⚠ API call failed (attempt {attempt+1}): {e}")
+            metrics.incr("gemini_retries_total")
             time.sleep(2)
+    metrics.incr("gemini_gave_up_total")
     return ""
 
-def extract_case_info(text):
-    """Extract structured case info using Gemini with chunking."""
+def extract_case_info(text, failed_chunks=None):
+    """
+    Extract structured case info using Gemini with chunking. If given,
+    `failed_chunks` receives the index of every chunk Gemini gave up on.
+    """
     chunks = chunk_text(text)
     merged_data = {key: "" for key in columns[1:]}  # empty fields initially
 
@@ -61,6 +59,8 @@ def extract_case_info(text):
         {chunk}
         """
         raw_text = call_gemini(prompt).strip()
+        if not raw_text and failed_chunks is not None:
+            failed_chunks.append(i)
         raw_text = re.sub(r"```json|```", "", raw_text).strip()
 
         try:
@@ -74,20 +74,24 @@ def extract_case_info(text):
     return merged_data
 
 def main():
-    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+    parser = argparse.ArgumentParser(description="Extract case fields from the stored judgments with Gemini.")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="CSV file to write")
+    args = parser.parse_args()
+
+    store = require_text_store()  # before the output CSV is truncated
+    with open(args.output, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.DictWriter(file, fieldnames=columns)
         writer.writeheader()
 
-        for filepath in glob.glob(os.path.join(INPUT_DIR, "*.txt")):
-            print(f"\n📂 Processing file: {filepath}")
-            with open(filepath, "r", encoding="utf-8") as f:
-                text = f.read()
+        for file_name, text in store.items():
+            print(f"\n📂 Processing file: {file_name}")
 
             case_info = extract_case_info(text)
-            case_info["File Name"] = os.path.basename(filepath)
+            case_info["File Name"] = file_name
             writer.writerow(case_info)
+            metrics.incr("cases_extracted_total")
 
-    print(f"\n✅ Extraction complete! Data saved in {OUTPUT_CSV}")
+    print(f"\n✅ Extraction complete! Data saved in {args.output}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,217 @@
+# dedup.py
+# Near-duplicate judgment detection with MinHash + locality-sensitive hashing.
+#
+# Exact dedupe (by case number or text hash) misses the same judgment scraped
+# from different searches or reported with slightly different headers. Each
+# text is reduced to a MinHash signature over word shingles; signatures are
+# split into LSH bands so only texts sharing a band bucket are compared, which
+# keeps detection sub-quadratic. Candidates are confirmed by their estimated
+# Jaccard similarity and grouped into clusters; the first record seen in a
+# cluster is kept as canonical. Texts are the raw judgments from the corpus
+# store; texts with fewer than MIN_SHINGLES shingles (e.g. "Appeal dismissed.")
+# are too short to tell apart and are never treated as duplicates.
+import re
+import os
+import zlib
+import hashlib
+
+NUM_PERM = 128
+THRESHOLD = 0.8       # estimated Jaccard similarity at which texts are duplicates
+SHINGLE_SIZE = 5      # words per shingle
+MIN_SHINGLES = 50     # shorter texts get no signature
+HASH_BLOCK = 2048     # shingles hashed at a time (bounds memory to num_perm * HASH_BLOCK)
+SEED = 1
+INDEX_FILE = "near_duplicates.npz"  # cached signatures shared by preprocessing.py and pipeline.py
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of normalized word n-grams (the whole text if it is shorter than n words)."""
+    words = re.findall(r"\w+", str(text).lower())
+    if not words:
+        return set()
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def lsh_params(num_perm=NUM_PERM, threshold=THRESHOLD):
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose S-curve threshold
+    (1/bands) ** (1/rows) sits closest to, but not above, `threshold`, so
+    true duplicates are unlikely to be missed by the banding step.
+    """
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        s = (1.0 / bands) ** (1.0 / rows)
+        if s <= threshold and threshold - s < best_gap:
+            best, best_gap = (bands, rows), threshold - s
+    return best
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures for a set of keyed texts, with LSH clustering.
+
+    Signatures are cached by text hash, so re-adding an unchanged text is
+    free; save()/load() persist the index between runs. Keys keep the order
+    in which they were first added, which decides the canonical copy of a
+    cluster, so rewriting a text never changes which copy is kept.
+    """
+    def __init__(self, num_perm=NUM_PERM, threshold=THRESHOLD, shingle_size=SHINGLE_SIZE,
+                 seed=SEED, min_shingles=MIN_SHINGLES):
+        import numpy as np
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.min_shingles = min_shingles
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        # multiply-shift hash family: h -> (a * h + b) >> 32 with odd 64-bit a
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.signatures = {}   # key -> np.ndarray (num_perm,) or None for empty/short texts
+        self.text_hashes = {}  # key -> sha1 of the text the signature was built from
+
+    def signature(self, text):
+        import numpy as np
+        grams = shingles(text, self.shingle_size)
+        if len(grams) < max(self.min_shingles, 1):
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams),
+                             dtype=np.uint64, count=len(grams))
+        sig = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(hashes), HASH_BLOCK):
+            # all permutations of one block at once; uint64 arithmetic wraps mod 2**64 by design
+            permuted = np.outer(self._a, hashes[start:start + HASH_BLOCK])
+            permuted += self._b[:, None]
+            permuted >>= np.uint64(32)
+            np.minimum(sig, permuted.min(axis=1), out=sig)
+        return sig
+
+    def add(self, key, text, text_hash=None):
+        """Sign `text` under `key`, unless the text with this sha1 is already signed."""
+        text_hash = text_hash or hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+        if self.text_hashes.get(key) == text_hash:
+            return
+        self.signatures[key] = self.signature(text)
+        self.text_hashes[key] = text_hash
+
+    def discard(self, key):
+        self.signatures.pop(key, None)
+        self.text_hashes.pop(key, None)
+
+    def update(self, text_hashes, load_text):
+        """
+        Make the index hold exactly the keys of `text_hashes` ({key: sha1 of
+        its text}); new keys are appended in that order. Only keys whose hash
+        changed are re-signed; load_text(key) is called for those alone.
+        """
+        for key in [k for k in self.signatures if k not in text_hashes]:
+            self.discard(key)
+        for key, text_hash in text_hashes.items():
+            if self.text_hashes.get(key) != text_hash:
+                self.add(key, load_text(key) or "", text_hash)
+
+    def sync(self, texts):
+        """Make the index hold exactly `texts` ({key: text}); new keys are appended in that order."""
+        hashes = {key: hashlib.sha1(str(text).encode("utf-8")).hexdigest() for key, text in texts.items()}
+        self.update(hashes, texts.get)
+
+    def similarity(self, key1, key2):
+        """Estimated Jaccard similarity of two indexed texts."""
+        import numpy as np
+        return float(np.mean(self.signatures[key1] == self.signatures[key2]))
+
+    def clusters(self, keys=None):
+        """Groups of near-duplicate keys (size >= 2), each in insertion order; optionally only among `keys`."""
+        wanted = set(self.signatures if keys is None else keys)
+        keys = [k for k, sig in self.signatures.items() if sig is not None and k in wanted]
+        position = {k: i for i, k in enumerate(keys)}
+        parent = list(range(len(keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets = {}
+            for key in keys:
+                bucket = self.signatures[key][start:start + self.rows].tobytes()
+                buckets.setdefault(bucket, []).append(key)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                first = members[0]
+                for other in members[1:]:
+                    root_a, root_b = find(position[first]), find(position[other])
+                    if root_a != root_b and self.similarity(first, other) >= self.threshold:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(find(i), []).append(key)
+        return [g for g in groups.values() if len(g) > 1]
+
+    def duplicates(self, keys=None):
+        """{duplicate_key: canonical_key}, where canonical is the first key of its cluster."""
+        return {dup: group[0] for group in self.clusters(keys) for dup in group[1:]}
+
+    def save(self, path):
+        import numpy as np
+        keys = list(self.signatures)
+        empty = np.full(self.num_perm, (1 << 32) - 1, dtype=np.uint64)
+        sigs = np.array([self.signatures[k] if self.signatures[k] is not None else empty for k in keys],
+                        dtype=np.uint64).reshape(len(keys), self.num_perm)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            keys=np.array(keys, dtype=str),
+            hashes=np.array([self.text_hashes[k] for k in keys], dtype=str),
+            present=np.array([self.signatures[k] is not None for k in keys], dtype=bool),
+            signatures=sigs,
+            params=np.array([self.num_perm, self.shingle_size, self.seed, self.min_shingles], dtype=np.int64),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, threshold=THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED,
+             min_shingles=MIN_SHINGLES):
+        """Load a saved index, or start empty if it is missing or built with other parameters."""
+        import numpy as np
+        index = cls(num_perm, threshold, shingle_size, seed, min_shingles)
+        if not os.path.exists(path):
+            return index
+        data = np.load(path)
+        if list(data["params"]) != [num_perm, shingle_size, seed, min_shingles]:
+            return index
+        for key, text_hash, present, sig in zip(data["keys"], data["hashes"], data["present"], data["signatures"]):
+            index.signatures[str(key)] = sig if present else None
+            index.text_hashes[str(key)] = str(text_hash)
+        return index
+
+def find_near_duplicates(texts, threshold=THRESHOLD, index=None):
+    """
+    Map every near-duplicate key in `texts` ({key: text}) to the key of the
+    first (canonical) text of its cluster. Pass a loaded NearDuplicateIndex
+    to reuse signatures from an earlier run.
+    """
+    index = index or NearDuplicateIndex(threshold=threshold)
+    index.sync(texts)
+    return index.duplicates()
+
+def find_corpus_duplicates(store, doc_ids=None, index_file=INDEX_FILE):
+    """
+    Near-duplicates among the raw judgments of a CorpusStore, as
+    {duplicate_id: canonical_id} (canonical = indexed first). Signatures are
+    cached in `index_file` by the store's sha1, so only new or changed
+    judgments are read and signed. `doc_ids` limits the result to those IDs.
+    """
+    index = NearDuplicateIndex.load(index_file)
+    index.update(store.digests(), store.get)
+    index.save(index_file)
+    return index.duplicates(doc_ids)
@@ -1,22 +1,85 @@
 # hybrid_search.py
-import chromadb
-from sentence_transformers import SentenceTransformer
-from neo4j import GraphDatabase
-
-NEO4J_URI = "neo4j://127.0.0.1:7687"
-NEO4J_USER = "neo4j"
-NEO4J_PASSWORD = "12345678"
-
-PERSIST_DIR = "chroma_index"
-
-# 1. Load Chroma
-client = chromadb.PersistentClient(path=PERSIST_DIR)
-collection = client.get_or_create_collection(name="legal_cases")
-
-# 2. Load embedding model
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+import argparse
+import metrics
+from resources import get_collection, get_model, get_driver
+
+# Graph re-ranking: how many Chroma chunks to pull per requested result, and
+# how much each shared neighbourhood contributes to the fused score.
+RERANK_POOL_FACTOR = 5
+GRAPH_WEIGHT = 0.3
+SHARED_ISSUE_WEIGHT = 1.0
+SHARED_JUDGE_WEIGHT = 0.5
+# Precomputed by citations.py and stored in chunk metadata as "authority" (0-1)
+AUTHORITY_WEIGHT = 0.1
+
+# One round trip for the whole candidate set: both ends of every pair of hits
+# are looked up through the case_number index, then only the edges between
+# them are checked, so a busy judge's or issue's other cases are never expanded.
+GRAPH_NEIGHBOURS_CYPHER = """
+UNWIND $case_numbers AS cn
+MATCH (c:Case {case_number: cn})
+UNWIND $case_numbers AS pn
+MATCH (o:Case {case_number: pn})
+WHERE o <> c
+WITH c, o,
+     size([(c)-[:ABOUT]->(i:LegalIssue)<-[:ABOUT]-(o) WHERE i.description <> "" | i]) AS shared_issues,
+     size([(c)-[:JUDGED_BY]->(j:Judge)<-[:JUDGED_BY]-(o) WHERE j.name <> "" | j]) AS shared_judges
+WHERE shared_issues > 0 OR shared_judges > 0
+RETURN c.case_number AS case_number, o.case_number AS peer, shared_issues, shared_judges
+"""
+
+def group_hits_by_case(results):
+    """Collapse Chroma chunk hits into one hit per case, keeping the best chunk."""
+    hits = {}
+    for i in range(len(results["ids"][0])):
+        metadata = results["metadatas"][0][i]
+        case_number = metadata.get("case_number") or metadata.get("file_name")
+        score = 1.0 - results["distances"][0][i]  # cosine distance -> similarity
+        if case_number not in hits or score > hits[case_number]["score"]:
+            hits[case_number] = {
+                "case_number": case_number,
+                "score": score,
+                "metadata": metadata,
+                "document": results["documents"][0][i],
+            }
+    return list(hits.values())
+
+def authority_bonus(hit):
+    return AUTHORITY_WEIGHT * hit["metadata"].get("authority", 0.0)
+
+def graph_rerank(hits, graph_weight=GRAPH_WEIGHT):
+    """
+    Re-rank vector hits using the case graph.
 
-def hybrid_search(query, court=None, start_date=None, end_date=None, top_k=3):
+    Each hit is boosted by the vector scores of the other hits it shares a
+    legal issue or judge with, so cases that sit in a dense, relevant
+    neighbourhood rise above isolated matches. The neighbourhoods for all
+    hits are fetched in a single parameterized Cypher query. Citation
+    authority precomputed by citations.py is added on top, when present.
+    """
+    scores = {h["case_number"]: h["score"] for h in hits}
+    records = []
+    if len(hits) > 1:
+        with get_driver().session() as session, metrics.timer("cypher_seconds", query="graph_rerank"):
+            records = session.run(GRAPH_NEIGHBOURS_CYPHER, case_numbers=list(scores)).data()
+
+    support = {}
+    for record in records:
+        weight = (SHARED_ISSUE_WEIGHT * record["shared_issues"]
+                  + SHARED_JUDGE_WEIGHT * record["shared_judges"])
+        case_number = record["case_number"]
+        support[case_number] = support.get(case_number, 0.0) + weight * scores[record["peer"]]
+    # cosine distance can exceed 1, so similarities may be negative
+    support = {c: max(total, 0.0) for c, total in support.items()}
+
+    max_support = max(support.values(), default=0.0)
+    for h in hits:
+        boost = support.get(h["case_number"], 0.0) / max_support if max_support else 0.0
+        h["graph_boost"] = boost
+        h["fused_score"] = (1 - graph_weight) * h["score"] + graph_weight * boost + authority_bonus(h)
+    return sorted(hits, key=lambda h: h["fused_score"], reverse=True)
+
+def hybrid_search(query, court=None, start_date=None, end_date=None, top_k=3, rerank=True):
     # Prepare filter dictionary for Chroma
     filters = {}
     if court:
@@ -33,28 +96,41 @@ def hybrid_search(query, court=None, start_date=None, end_date=None, top_k=3):
     print("\nFilters applied:", filters if filters else "None")
 
     # Encode query
-    query_embedding = model.encode([query]).tolist()
-
-    # Search in Chroma
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=top_k,
-        where=filters if filters else None
-    )
+    with metrics.timer("embed_seconds", kind="query"):
+        query_embedding = get_model().encode([query]).tolist()
+
+    # Search in Chroma (over-fetch so the graph stage has candidates to re-order)
+    with metrics.timer("chroma_query_seconds"):
+        results = get_collection().query(
+            query_embeddings=query_embedding,
+            n_results=top_k * RERANK_POOL_FACTOR if rerank else top_k,
+            where=filters if filters else None
+        )
+
+    hits = group_hits_by_case(results)
+    if rerank:
+        hits = graph_rerank(hits)
+    else:
+        for h in hits:
+            h["fused_score"] = h["score"] + authority_bonus(h)
+        hits.sort(key=lambda h: h["fused_score"], reverse=True)
+    hits = hits[:top_k]
 
     # Display results
-    for i in range(len(results["ids"][0])):
+    for i, hit in enumerate(hits):
+        metadata = hit["metadata"]
         print("\n--- Result", i+1, "---")
-        print("Case Title:", results["metadatas"][0][i].get("case_title"))
-        print("Court:", results["metadatas"][0][i].get("court"))
-        print("Date:", results["metadatas"][0][i].get("date"))
-        print("Case Number:", results["metadatas"][0][i].get("case_number"))
-        print("Local Path:", results["metadatas"][0][i].get("local_path"))
-        print("Chunk Preview:", results["documents"][0][i][:300], "...")
+        print("Case Title:", metadata.get("case_title"))
+        print("Court:", metadata.get("court"))
+        print("Date:", metadata.get("date"))
+        print("Case Number:", metadata.get("case_number"))
+        print("Local Path:", metadata.get("local_path"))
+        print("Score:", round(hit["fused_score"], 4))
+        print("Chunk Preview:", hit["document"][:300], "...")
         print("---------------------")
+    return hits
 
 def neo4j_search(query, court=None, start_date=None, end_date=None, top_k=3):
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
     cypher = """
     MATCH (c:Case)-[:HEARD_IN]->(court:Court)
     WHERE (
@@ -88,7 +164,7 @@ def neo4j_search(query, court=None, start_date=None, end_date=None, top_k=3):
         date_filter=date_filter
     )
 
-    with driver.session() as session:
+    with get_driver().session() as session, metrics.timer("cypher_seconds", query="neo4j_search"):
         results = session.run(cypher, parameters=params)
         for record in results:
             case = record["c"]
@@ -100,13 +176,30 @@ def neo4j_search(query, court=None, start_date=None, end_date=None, top_k=3):
             print("Case Number:", case.get("case_number"))
             print("Summary:", case.get("decision_summary", "")[:300], "...")
             print("---------------------")
-    driver.close()
 
-if __name__ == "__main__":
-    user_query = input("Enter your legal query: ").strip()
-    court_name = input("Filter by court (leave blank for all): ").strip() or None
-    start_date = input("Start date (YYYY-MM-DD, leave blank for none): ").strip() or None
-    end_date = input("End date (YYYY-MM-DD, leave blank for none): ").strip() or None
+def main():
+    parser = argparse.ArgumentParser(description="Search legal cases in Chroma and Neo4j.")
+    parser.add_argument("query", nargs="?", help="legal query (prompted for when omitted)")
+    parser.add_argument("--court", help="filter by court")
+    parser.add_argument("--start-date", help="YYYY-MM-DD")
+    parser.add_argument("--end-date", help="YYYY-MM-DD")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-rerank", action="store_true", help="skip graph re-ranking")
+    args = parser.parse_args()
+
+    if args.query:
+        user_query, court_name = args.query, args.court
+        start_date, end_date = args.start_date, args.end_date
+    else:
+        user_query = input("Enter your legal query: ").strip()
+        court_name = input("Filter by court (leave blank for all): ").strip() or None
+        start_date = input("Start date (YYYY-MM-DD, leave blank for none): ").strip() or None
+        end_date = input("End date (YYYY-MM-DD, leave blank for none): ").strip() or None
+
+    hybrid_search(user_query, court=court_name, start_date=start_date, end_date=end_date,
+                  top_k=args.top_k, rerank=not args.no_rerank)
+    neo4j_search(user_query, court=court_name, start_date=start_date, end_date=end_date,
+                 top_k=args.top_k)
 
-    hybrid_search(user_query, court=court_name, start_date=start_date, end_date=end_date)
-    neo4j_search(user_query,court=court_name,start_date=start_date,end_date=end_date)
+if __name__ == "__main__":
+    main()
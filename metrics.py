@@ -0,0 +1,269 @@
+# metrics.py
+# Lightweight instrumentation shared by all scripts: counters, timers and
+# histograms, plus opt-in cProfile / tracemalloc capture around a stage.
+#
+# Disabled by default; when disabled, timer() returns a shared no-op and
+# timed() returns the function unchanged. Configure with environment variables:
+#
+#   IPD_METRICS=jsonl|prom    enable, and pick the snapshot format
+#   IPD_METRICS_FILE=path     where snapshots go (default metrics.jsonl / metrics.prom)
+#   IPD_PROFILE=cpu,mem       profile every metrics.profile(...) block
+#   IPD_PROFILE_DIR=path      where profiles go (default profiles/)
+#
+# A snapshot is written when the process exits (or call emit()).
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from contextlib import contextmanager
+
+FORMAT = os.getenv("IPD_METRICS", "").strip().lower()
+ENABLED = FORMAT not in ("", "0", "false", "off")
+if ENABLED and FORMAT not in ("jsonl", "prom"):
+    FORMAT = "jsonl"
+METRICS_FILE = os.getenv("IPD_METRICS_FILE") or ("metrics.prom" if FORMAT == "prom" else "metrics.jsonl")
+PROFILE = {p.strip() for p in os.getenv("IPD_PROFILE", "").lower().split(",") if p.strip()}
+PROFILE_DIR = os.getenv("IPD_PROFILE_DIR", "profiles")
+
+# Upper bounds (seconds) for latency histograms: 1ms .. 60s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_cpu_profiling = False  # only one cProfile.Profile can be enabled at a time (Python 3.12+)
+_mem_profiling = False  # tracemalloc is process-wide; the owning stage starts and stops it
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+# -------------------------
+# Recording
+# -------------------------
+def incr(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(value)
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            incr(self.name.replace("_seconds", "") + "_errors_total", **self.labels)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name, **labels):
+    """Context manager recording the block's duration in histogram `name`."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+def timed(name, **labels):
+    """Decorator form of timer(); a no-op when metrics are disabled."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(name, labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# -------------------------
+# Snapshots
+# -------------------------
+def snapshot():
+    """All metrics as a JSON-serializable dict."""
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v}
+                    for (n, l), v in sorted(_counters.items())]
+        histograms = [{
+            "name": n, "labels": dict(l),
+            "count": h.count, "sum": round(h.sum, 6),
+            "min": h.min, "max": h.max,
+            "p50": h.quantile(0.5), "p99": h.quantile(0.99),
+        } for (n, l), h in sorted(_histograms.items())]
+    return {"timestamp": time.time(), "pid": os.getpid(),
+            "counters": counters, "histograms": histograms}
+
+def _prom_escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _prom_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in items) + "}"
+
+def prometheus_text():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name in sorted({n for n, _ in _counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, l), v in sorted(_counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_prom_labels(l)} {v}")
+        for name in sorted({n for n, _ in _histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, l), h in sorted(_histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip(BUCKETS + ("+Inf",), h.counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{_prom_labels(l, {'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{_prom_labels(l)} {h.sum}")
+                lines.append(f"{name}_count{_prom_labels(l)} {h.count}")
+    return "\n".join(lines) + "\n"
+
+def emit(path=None):
+    """Append a JSON-lines snapshot, or overwrite a Prometheus text file."""
+    if not ENABLED:
+        return
+    path = path or METRICS_FILE
+    if FORMAT == "prom":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot()) + "\n")
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+if ENABLED:
+    atexit.register(emit)
+
+# -------------------------
+# Profiling
+# -------------------------
+@contextmanager
+def profile(stage):
+    """
+    Time a stage and, if IPD_PROFILE asks for it, capture a cProfile dump
+    (cpu) and/or the top tracemalloc allocation sites (mem) into PROFILE_DIR.
+    """
+    if not PROFILE:
+        with timer("stage_seconds", stage=stage):
+            yield
+        return
+
+    global _cpu_profiling, _mem_profiling
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    profiler = None
+    owns_cpu = traced = False
+    if "cpu" in PROFILE:
+        import cProfile
+        # stages may run in parallel; only the first one owns the profiler
+        with _lock:
+            if not _cpu_profiling:
+                _cpu_profiling = owns_cpu = True
+        if owns_cpu:
+            profiler = cProfile.Profile()
+    if "mem" in PROFILE:
+        import tracemalloc
+        # stages may run in parallel; only the first one owns tracemalloc
+        with _lock:
+            if not _mem_profiling and not tracemalloc.is_tracing():
+                _mem_profiling = traced = True
+        if traced:
+            tracemalloc.start()
+    try:
+        with timer("stage_seconds", stage=stage):
+            if profiler:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    profiler = None  # another profiling tool is active
+            try:
+                yield
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        if profiler:
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{stage}-{stamp}.prof"))
+        if owns_cpu:
+            with _lock:
+                _cpu_profiling = False
+        if traced:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:25]
+            tracemalloc.stop()
+            with _lock:
+                _mem_profiling = False
+            with open(os.path.join(PROFILE_DIR, f"{stage}-{stamp}.mem.txt"), "w", encoding="utf-8") as f:
+                f.write(f"current={current} peak={peak}\n")
+                for stat in top:
+                    f.write(f"{stat}\n")
@@ -1,22 +1,44 @@
+import re
+import argparse
 import csv
-from neo4j import GraphDatabase
+import metrics
+# ⚡ Step 1: Local Neo4j connection details (see resources.py / .env)
+from resources import get_driver
 
-# ⚡ Step 1: Local Neo4j connection details
-URI = "neo4j://127.0.0.1:7687"   # default local connection
-USER = "neo4j"                  # your DB username
-PASSWORD = "12345678"           # the password you set during setup
-
-driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+CSV_PATH = "extracted_cases_clean.csv"
 
 # ⚡ Step 2: Load cases into Neo4j from CSV
-def load_cases_into_neo4j(csv_file):
+def create_constraints(session):
+    # Index-backed lookups by case number (used by MERGE and graph re-ranking)
+    session.run("CREATE CONSTRAINT case_number IF NOT EXISTS "
+                "FOR (c:Case) REQUIRE c.case_number IS UNIQUE")
+
+def load_cases_into_neo4j(csv_file, driver):
     with driver.session() as session:
+        create_constraints(session)
         with open(csv_file, encoding="utf-8") as f:
             reader = csv.DictReader(f)
             for row in reader:
-                session.execute_write(create_case_graph, row)
+                with metrics.timer("neo4j_write_seconds", query="create_case_graph"):
+                    session.execute_write(create_case_graph, row)
 
 # ⚡ Step 3: Define graph structure
+def split_judges(judges):
+    """Judge names from a bench string; Gemini separates them with "," or ";"."""
+    return [name.strip() for name in re.split(r"[;,]", judges or "") if name.strip()]
+
+def split_issues(issues):
+    """
+    Legal issue descriptions from a ";"-separated cell, lowercased and stripped
+    of punctuation so "Cruelty." and "cruelty" become the same LegalIssue node.
+    """
+    keys = []
+    for issue in (issues or "").split(";"):
+        key = " ".join(re.sub(r"[^\w\s]", " ", issue.lower()).split())
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
 def create_case_graph(tx, row):
     tx.run("""
         MERGE (c:Case {case_number: $CaseNumber})
@@ -30,8 +52,8 @@ def create_case_graph(tx, row):
         MERGE (court:Court {name: $CourtName})
         MERGE (c)-[:HEARD_IN]->(court)
 
-        FOREACH (judge IN split($Judges, ";") |
-            MERGE (j:Judge {name: trim(judge)})
+        FOREACH (judge IN $Judges |
+            MERGE (j:Judge {name: judge})
             MERGE (c)-[:JUDGED_BY]->(j)
         )
 
@@ -45,8 +67,8 @@ def create_case_graph(tx, row):
             MERGE (c)-[:AGAINST]->(r)
         )
 
-        FOREACH (issue IN split($LegalIssues, ";") |
-            MERGE (i:LegalIssue {description: trim(issue)})
+        FOREACH (issue IN $LegalIssues |
+            MERGE (i:LegalIssue {description: issue})
             MERGE (c)-[:ABOUT]->(i)
         )
     """,
@@ -55,14 +77,22 @@ def create_case_graph(tx, row):
     CourtName=row["Court Name"],
     DateOfJudgment=row["Date of Judgment"],
     CaseNumber=row["Case Number"],
-    Judges=row["Judges"],
+    Judges=split_judges(row["Judges"]),
     Petitioners=row["Petitioner(s)"],
     Respondents=row["Respondent(s)"],
-    LegalIssues=row["Legal Issues"],
+    LegalIssues=split_issues(row["Legal Issues"]),
     DecisionSummary=row["Decision Summary"],
     Outcome=row["Outcome"],
     Citations=row["Citations"])
 
 # ⚡ Step 4: Run the loader
-load_cases_into_neo4j("extracted_cases_clean.csv")
-driver.close()
+def main():
+    parser = argparse.ArgumentParser(description="Load the cleaned cases into Neo4j.")
+    parser.add_argument("--csv", default=CSV_PATH, help="cleaned case CSV")
+    args = parser.parse_args()
+
+    with metrics.profile("neo4j_load"):
+        load_cases_into_neo4j(args.csv, get_driver())
+
+if __name__ == "__main__":
+    main()
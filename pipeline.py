@@ -0,0 +1,357 @@
+# pipeline.py
+# Incremental end-to-end pipeline:
+#
+#   corpus store -> extract (dataset.py) -> clean (cleaning.py) -> chunk (preprocessing.py) -> chroma
+#                                    \-------------------------------------> neo4j
+#
+# Every stage records a content hash per record (keyed by the judgment's file
+# name) in STATE_FILE; for the extract stage this is the sha1 the corpus store
+# already keeps in its index, so only new or changed judgments are read. On the
+# next run only records whose input hash changed are processed; unchanged
+# outputs are reused from the stage's usual output file (extracted_cases.csv,
+# extracted_cases_clean.csv, cases_chunks.jsonl). Near-duplicate judgments
+# (dedup.py, over the raw text) are dropped before extraction, so copies never
+# reach Gemini. Stages that do not depend on each other (e.g. the Chroma and
+# Neo4j sinks) run in parallel; the model, Chroma client and driver are only
+# created when a sink has work. Delete STATE_FILE to force a full rebuild.
+import os
+import argparse
+import csv
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import dataset
+import cleaning
+import preprocessing
+import neo
+import metrics
+import resources
+import build_vector_store
+from dedup import find_corpus_duplicates
+
+STATE_FILE = "pipeline_state.json"
+EXTRACT_CHECKPOINT = 25  # save extracted_cases.csv after this many Gemini extractions
+
+# -------------------------
+# Engine
+# -------------------------
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    process(changed, removed, inputs) receives only the dirty records
+    ({record_id: record}), the ids that disappeared upstream and the full
+    (selected) input, and returns {record_id: output} for the dirty records;
+    an output of None marks a record that failed and is retried next run.
+    select(inputs) optionally filters the upstream records before dirty
+    checking, load() returns previously persisted outputs and save(outputs)
+    persists the full output set, returning the ids it kept (None for all).
+    Records save() leaves out are not passed downstream. Stages without
+    save() are sinks. With checkpoint=N, dirty records are processed N at a
+    time and saved after every batch.
+    """
+    def __init__(self, name, deps, process, select=None, load=None, save=None, version="1",
+                 checkpoint=None):
+        if len(deps) > 1:
+            raise ValueError(f"Stage {name!r} has several dependencies; stages read one upstream output.")
+        self.name = name
+        self.deps = deps
+        self.process = process
+        self.select = select
+        self.load = load
+        self.save = save
+        self.version = version
+        self.checkpoint = checkpoint
+
+def content_hash(record, version=""):
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1((version + payload).encode("utf-8")).hexdigest()
+
+def topological_order(stages):
+    """Stages ordered so that every stage comes after its dependencies."""
+    done, order = set(), []
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(d in done for d in s.deps)]
+        if not ready:
+            raise ValueError("Pipeline stages contain a cycle or a missing dependency.")
+        order.extend(ready)
+        done.update(s.name for s in ready)
+        remaining = [s for s in remaining if s.name not in done]
+    return order
+
+class Pipeline:
+    def __init__(self, stages, source, state_file=STATE_FILE):
+        self.stages = stages
+        self.source = source  # callable returning {record_id: record} for root stages
+        self.state_file = state_file
+        self.state = self._load_state()
+        self.outputs = {}
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        with self._lock:
+            tmp = self.state_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.state_file)
+
+    def _commit(self, stage, inputs, hashes, seen, cached, fresh, processed, filtered, save=True):
+        """Persist the outputs and hashes of every record processed so far; returns the outputs."""
+        done = {rid for rid in processed if not (rid in fresh and fresh[rid] is None)}
+        outputs = {rid: fresh[rid] if fresh.get(rid) is not None else cached.get(rid) for rid in inputs}
+        # failed or not yet processed records keep their previous hash, so they stay dirty
+        state_hashes = {rid: hashes[rid] if rid in done else seen[rid]
+                        for rid in inputs if rid in done or rid in seen}
+        if stage.save:
+            outputs = {rid: out for rid, out in outputs.items() if out is not None}
+            if save:
+                kept = stage.save(outputs)
+                filtered = set() if kept is None else set(outputs) - set(kept)
+        filtered &= set(inputs)
+        outputs = {rid: out for rid, out in outputs.items() if rid not in filtered}
+
+        with self._lock:
+            self.state[stage.name] = {"hashes": state_hashes, "filtered": sorted(filtered)}
+        self._save_state()
+        return outputs
+
+    def _run_stage(self, stage):
+        if stage.deps:
+            inputs = self.outputs[stage.deps[0]]
+        else:
+            inputs = self.source()
+        if stage.select:
+            inputs = stage.select(inputs)
+
+        previous = self.state.get(stage.name, {})
+        seen = previous.get("hashes", {})
+        filtered = set(previous.get("filtered", []))
+        cached = stage.load() if stage.load else {}
+        hashes = {rid: content_hash(record, stage.version) for rid, record in inputs.items()}
+        # a kept record whose output is missing from the saved file is redone
+        changed = {
+            rid: inputs[rid] for rid, h in hashes.items()
+            if seen.get(rid) != h or (stage.save and rid not in filtered and rid not in cached)
+        }
+        removed = [rid for rid in seen if rid not in inputs]
+        if changed or removed:
+            # whether a record is filtered out can depend on the others (e.g. which
+            # of two duplicates comes first), so re-decide them when anything moves
+            changed.update((rid, inputs[rid]) for rid in filtered if rid in inputs)
+
+        print(f"[{stage.name}] {len(inputs)} records: "
+              f"{len(changed)} dirty, {len(removed)} removed")
+        metrics.incr("records_dirty_total", len(changed), stage=stage.name)
+        fresh, processed = {}, set()
+        if changed or removed:
+            ids = list(changed)
+            size = stage.checkpoint or max(len(ids), 1)
+            batches = [ids[i:i + size] for i in range(0, len(ids), size)] or [[]]
+            with metrics.profile(stage.name):
+                for n, batch in enumerate(batches):
+                    fresh.update(stage.process({rid: changed[rid] for rid in batch},
+                                               removed if n == 0 else [], inputs))
+                    processed.update(batch)
+                    if n < len(batches) - 1:
+                        self._commit(stage, inputs, hashes, seen, cached, fresh, processed, filtered)
+
+        failed = [rid for rid, out in fresh.items() if out is None]
+        if failed:
+            print(f"[{stage.name}] {len(failed)} records failed; they are retried on the next run")
+        outputs = self._commit(stage, inputs, hashes, seen, cached, fresh, processed, filtered,
+                               save=bool(changed or removed))
+        with self._lock:
+            self.outputs[stage.name] = outputs
+
+    def run(self):
+        """Start every stage as soon as the stage it depends on has finished."""
+        order = topological_order(self.stages)
+        futures = {}
+
+        def run_after(stage, deps):
+            for dep in deps:
+                dep.result()
+            self._run_stage(stage)
+
+        # one worker per stage, submitted in dependency order, so waiting never deadlocks
+        with ThreadPoolExecutor(max_workers=len(order)) as pool:
+            for stage in order:
+                futures[stage.name] = pool.submit(run_after, stage, [futures[d] for d in stage.deps])
+            for future in futures.values():
+                future.result()
+
+# -------------------------
+# Stage implementations
+# -------------------------
+def read_csv_rows(path, key="File Name"):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {row[key]: row for row in csv.DictReader(f)}
+
+def write_csv_rows(path, rows):
+    with open(path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=dataset.columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+def read_corpus_digests():
+    # {file name: sha1} from the store index, in store order; no text is read
+    return resources.require_text_store().digests()
+
+def drop_near_duplicates(digests):
+    """Skip near-duplicate judgments before extraction (no Gemini call for copies)."""
+    if not digests:
+        return digests
+    duplicates = find_corpus_duplicates(resources.get_text_store(), list(digests))
+    if duplicates:
+        print(f"[extract] skipping {len(duplicates)} near-duplicate judgments")
+    return {rid: h for rid, h in digests.items() if rid not in duplicates}
+
+def extract(changed, removed, inputs):
+    store = resources.get_text_store()
+    rows = {}
+    for file_name in changed:
+        print(f"\n📂 Processing file: {file_name}")
+        failed_chunks = []
+        case_info = dataset.extract_case_info(store.get(file_name), failed_chunks)
+        if failed_chunks or not any(case_info.values()):
+            rows[file_name] = None  # Gemini failed; keep the record dirty
+            continue
+        case_info["File Name"] = file_name
+        # store values as the CSV will read them back, so hashes stay stable
+        rows[file_name] = {k: "" if v is None else str(v) for k, v in case_info.items()}
+    return rows
+
+def clean_row(row):
+    row = {k: ("" if v is None else v) for k, v in row.items()}
+    row["Date of Judgment"] = cleaning.standardize_date(row["Date of Judgment"])
+    row["Judges"] = cleaning.clean_judge_names(row["Judges"])
+    return row
+
+def clean(changed, removed, inputs):
+    return {rid: clean_row(row) for rid, row in changed.items()}
+
+def dedupe(rows, key_fields):
+    """Keep the first record for every key, like DataFrame.drop_duplicates."""
+    seen, kept = set(), {}
+    for rid, row in rows.items():
+        key = tuple(row.get(k, "") for k in key_fields)
+        if key not in seen:
+            seen.add(key)
+            kept[rid] = row
+    return kept
+
+def select_unique_cases(rows):
+    return dedupe(rows, ["Case Number", "Court Name", "Date of Judgment"])
+
+def detect_text_column(rows):
+    import pandas as pd
+    return preprocessing.find_text_column(pd.DataFrame(list(rows.values())))
+
+def select_chunkable_cases(rows):
+    rows = select_unique_cases(rows)
+    if any(row.get("Case Number", "").strip() for row in rows.values()):
+        rows = dedupe(rows, ["Case Number"])
+    return rows
+
+def save_clean(rows):
+    unique = select_unique_cases(rows)
+    write_csv_rows(cleaning.OUTPUT_CSV, unique.values())
+    return unique
+
+def chunk(changed, removed, inputs):
+    text_col = detect_text_column(inputs)
+    docs = {}
+    for rid, row in changed.items():
+        row = dict(row, date_normalized=preprocessing.normalize_date(row.get("Date of Judgment")))
+        docs[rid] = preprocessing.row_to_docs(row, rid, text_col)
+    return docs
+
+def load_chunks():
+    grouped = {}
+    if not os.path.exists(preprocessing.OUTPUT_JSONL):
+        return grouped
+    with open(preprocessing.OUTPUT_JSONL, "r", encoding="utf-8") as f:
+        for line in f:
+            doc = json.loads(line)
+            grouped.setdefault(doc["metadata"]["file_name"], []).append(doc)
+    return grouped
+
+def save_chunks(grouped):
+    with open(preprocessing.OUTPUT_JSONL, "w", encoding="utf-8") as fout:
+        for docs in grouped.values():
+            for doc in docs:
+                fout.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    # cases without text produce no chunks and have nothing to index
+    return [rid for rid, docs in grouped.items() if docs]
+
+def chroma_sink(changed, removed, inputs):
+    collection = resources.get_collection()
+    stale = list(changed) + removed
+    for i in range(0, len(stale), 500):
+        collection.delete(where={"file_name": {"$in": stale[i:i + 500]}})
+    docs = [doc for docs in changed.values() for doc in docs]
+    if docs:
+        build_vector_store.add_chunks(collection, resources.get_model(), docs, show_progress_bar=False)
+    print(f"[chroma] upserted {len(docs)} chunks, removed {len(removed)} cases")
+    return {}
+
+def delete_case(tx, file_name):
+    tx.run("MATCH (c:Case {file_name: $file_name}) DETACH DELETE c", file_name=file_name)
+
+def replace_case_graph(tx, row):
+    # drop the case's old facts (but keep citation edges) before re-merging them
+    tx.run("""
+        MATCH (c:Case {file_name: $file_name})-[r]->()
+        WHERE type(r) <> 'CITES'
+        DELETE r
+    """, file_name=row["File Name"])
+    neo.create_case_graph(tx, row)
+
+def neo4j_sink(changed, removed, inputs):
+    with resources.get_driver().session() as session:
+        neo.create_constraints(session)
+        for file_name in removed:
+            with metrics.timer("neo4j_write_seconds", query="delete_case"):
+                session.execute_write(delete_case, file_name)
+        for row in changed.values():
+            with metrics.timer("neo4j_write_seconds", query="replace_case_graph"):
+                session.execute_write(replace_case_graph, row)
+    print(f"[neo4j] merged {len(changed)} cases, removed {len(removed)} cases")
+    return {}
+
+STAGES = [
+    Stage("extract", [], extract, select=drop_near_duplicates, version="2", checkpoint=EXTRACT_CHECKPOINT,
+          load=lambda: read_csv_rows(dataset.OUTPUT_CSV),
+          save=lambda rows: write_csv_rows(dataset.OUTPUT_CSV, rows.values())),
+    Stage("clean", ["extract"], clean,
+          load=lambda: read_csv_rows(cleaning.OUTPUT_CSV),
+          save=save_clean),
+    Stage("chunk", ["clean"], chunk, select=select_chunkable_cases,
+          load=load_chunks, save=save_chunks),
+    Stage("chroma", ["chunk"], chroma_sink),
+    Stage("neo4j", ["clean"], neo4j_sink, select=select_unique_cases),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring every pipeline stage up to date with the corpus store.")
+    parser.add_argument("--state-file", default=STATE_FILE,
+                        help="per-record hashes from the last run (delete to force a full rebuild)")
+    args = parser.parse_args()
+
+    Pipeline(STAGES, source=read_corpus_digests, state_file=args.state_file).run()
+    print("\n✅ Pipeline up to date.")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,15 @@
 # preprocessing_step1.py
-import os
 import re
+import argparse
 import json
 import hashlib
-import pandas as pd
 from datetime import datetime
-from tqdm import tqdm
+import metrics
+# tiktoken gives accurate token counts when installed (optional, loaded on first use)
+from resources import get_tokenizer, get_text_store
+from dedup import find_corpus_duplicates
 
-# Attempt to import tiktoken for accurate token counts (optional).
-try:
-    import tiktoken
-    tiktoken_encoder = tiktoken.get_encoding("cl100k_base")
-except Exception:
-    tiktoken_encoder = None
-
-CSV_PATH = "extracted_cases_clean.csv"   # change if needed
-SCRAPPED_TEXT_DIR = "scrappedText"       # used to attach file paths if present
+CSV_PATH = "extracted_cases_clean.csv"
 OUTPUT_JSONL = "cases_chunks.jsonl"
 
 # -------------------------
@@ -31,6 +25,7 @@ def find_text_column(df):
     return max(lengths, key=lengths.get)
 
 def estimate_tokens(text):
+    tiktoken_encoder = get_tokenizer()
     if tiktoken_encoder:
         return len(tiktoken_encoder.encode(text))
     # fallback: approximate tokens = words * 1.33
@@ -39,6 +34,7 @@ def estimate_tokens(text):
 
 def normalize_date(date_val):
     # try common date formats; returns ISO string or None
+    import pandas as pd
     if pd.isna(date_val):
         return None
     for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y"):
@@ -61,6 +57,7 @@ def hash_text(text):
 # Chunking function: uses sentence accumulation (robust if no tokenizer).
 def chunk_text_by_tokens(text, chunk_size_tokens=700, overlap_tokens=100):
     # If tiktoken available, slice by token ids; otherwise accumulate sentences until approx size.
+    tiktoken_encoder = get_tokenizer()
     if tiktoken_encoder:
         tok_ids = tiktoken_encoder.encode(text)
         chunks = []
@@ -99,102 +96,128 @@ def chunk_text_by_tokens(text, chunk_size_tokens=700, overlap_tokens=100):
         chunks.append(" ".join(cur).strip())
     return chunks
 
+def row_to_docs(row, idx, text_col):
+    """Chunk one case row into the JSONL documents written to OUTPUT_JSONL."""
+    file_name = row.get("File Name") or row.get("file_name") or f"row_{idx}"
+    case_title = row.get("Case Title") or row.get("Case_Title") or row.get("case_title") or ""
+    court = row.get("Court Name") or ""
+    case_number = row.get("Case Number") or ""
+    date_j = row.get("date_normalized") or ""
+    judges = row.get("Judges") or ""
+    petitioner = row.get("Petitioner(s)") or row.get("Petitioner") or ""
+    respondent = row.get("Respondent(s)") or row.get("Respondent") or ""
+    legal_issues = row.get("Legal Issues") or ""
+    outcome = row.get("Outcome") or ""
+    citations = row.get("Citations") or ""
+    full_text = row[text_col] if text_col in row else str(row)
+
+    # reference the scrapped text in the corpus store if it exists
+    local_path = ""
+    store = get_text_store()
+    stored_name = file_name if file_name in store else file_name + ".txt"
+    if stored_name in store:
+        local_path = store.uri(stored_name)
+
+    docs = []
+    chunks = chunk_text_by_tokens(full_text, chunk_size_tokens=700, overlap_tokens=120)
+    for i, chunk in enumerate(chunks):
+        docs.append({
+            "id": f"{file_name}__chunk_{i}",
+            "text": chunk,
+            "metadata": {
+                "file_name": file_name,
+                "case_title": case_title,
+                "court": court,
+                "case_number": case_number,
+                "date": date_j,
+                "judges": judges,
+                "petitioner": petitioner,
+                "respondent": respondent,
+                "legal_issues": legal_issues,
+                "outcome": outcome,
+                "citations": citations,
+                "local_path": local_path  # corpus store reference to the original txt, if available
+            }
+        })
+    return docs
+
 # -------------------------
 # Main preprocessing
 # -------------------------
-print("Loading CSV:", CSV_PATH)
-df = pd.read_csv(CSV_PATH, dtype=str).fillna("")
-
-print("Columns found:", list(df.columns))
-
-text_col = find_text_column(df)
-print("Detected text column:", text_col)
-
-# Basic checks
-print("Total rows:", len(df))
-# show the first 3 rows (some columns)
-print("Sample rows:")
-print(df.head(3).T)
-
-# compute some metadata columns if present (safe access)
-for col in ["Case Title", "File Name", "Case Number", "Court Name", "Date of Judgment"]:
-    if col not in df.columns:
-        df[col] = ""
-
-# Normalize date column
-print("Normalizing dates...")
-df["date_normalized"] = df["Date of Judgment"].apply(normalize_date)
-
-# token & word counts
-print("Estimating token counts...")
-df["word_count"] = df[text_col].astype(str).apply(lambda t: len(t.split()))
-df["token_estimate"] = df[text_col].astype(str).apply(estimate_tokens)
-
-# dedupe by case number or text hash
-if "Case Number" in df.columns and df["Case Number"].str.strip().replace("", pd.NA).notna().any():
+def main():
+    parser = argparse.ArgumentParser(description="Chunk the cleaned cases into JSONL for embedding.")
+    parser.add_argument("--input", default=CSV_PATH, help="cleaned case CSV")
+    parser.add_argument("--output", default=OUTPUT_JSONL, help="JSONL file to write")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from tqdm import tqdm
+
+    print("Loading CSV:", args.input)
+    df = pd.read_csv(args.input, dtype=str).fillna("")
+
+    print("Columns found:", list(df.columns))
+
+    text_col = find_text_column(df)
+    print("Detected text column:", text_col)
+
+    # Basic checks
+    print("Total rows:", len(df))
+    # show the first 3 rows (some columns)
+    print("Sample rows:")
+    print(df.head(3).T)
+
+    # compute some metadata columns if present (safe access)
+    for col in ["Case Title", "File Name", "Case Number", "Court Name", "Date of Judgment"]:
+        if col not in df.columns:
+            df[col] = ""
+
+    # Normalize date column
+    print("Normalizing dates...")
+    df["date_normalized"] = df["Date of Judgment"].apply(normalize_date)
+
+    # token & word counts
+    print("Estimating token counts...")
+    df["word_count"] = df[text_col].astype(str).apply(lambda t: len(t.split()))
+    df["token_estimate"] = df[text_col].astype(str).apply(estimate_tokens)
+
+    # dedupe by case number or text hash
+    if "Case Number" in df.columns and df["Case Number"].str.strip().replace("", pd.NA).notna().any():
+        before = len(df)
+        df = df.drop_duplicates(subset=["Case Number"], keep="first")
+        after = len(df)
+        print(f"Dropped {before-after} duplicate rows by Case Number.")
+    else:
+        # dedupe by text hash
+        df["text_hash"] = df[text_col].astype(str).apply(hash_text)
+        before = len(df)
+        df = df.drop_duplicates(subset=["text_hash"], keep="first")
+        after = len(df)
+        print(f"Dropped {before-after} duplicate rows by text hash.")
+
+    # drop near-duplicate judgments (re-scraped or re-headed copies) before chunking,
+    # comparing the raw judgment text in the corpus store rather than the summary
+    print("Detecting near-duplicates (MinHash/LSH)...")
+    store = get_text_store()
+    stored = {idx: name if name in store else name + ".txt" for idx, name in df["File Name"].items()}
+    duplicates = find_corpus_duplicates(store, [name for name in stored.values() if name in store])
     before = len(df)
-    df = df.drop_duplicates(subset=["Case Number"], keep="first")
-    after = len(df)
-    print(f"Dropped {before-after} duplicate rows by Case Number.")
-else:
-    # dedupe by text hash
-    df["text_hash"] = df[text_col].astype(str).apply(hash_text)
-    before = len(df)
-    df = df.drop_duplicates(subset=["text_hash"], keep="first")
-    after = len(df)
-    print(f"Dropped {before-after} duplicate rows by text hash.")
-
-# Prepare chunks and write JSONL
-print("Chunking texts and writing to", OUTPUT_JSONL)
-total_chunks = 0
-with open(OUTPUT_JSONL, "w", encoding="utf-8") as fout:
-    for idx, row in tqdm(df.iterrows(), total=len(df)):
-        file_name = row.get("File Name") or row.get("file_name") or f"row_{idx}"
-        case_title = row.get("Case Title") or row.get("Case_Title") or row.get("case_title") or ""
-        court = row.get("Court Name") or ""
-        case_number = row.get("Case Number") or ""
-        date_j = row.get("date_normalized") or ""
-        judges = row.get("Judges") or ""
-        petitioner = row.get("Petitioner(s)") or row.get("Petitioner") or ""
-        respondent = row.get("Respondent(s)") or row.get("Respondent") or ""
-        legal_issues = row.get("Legal Issues") or ""
-        outcome = row.get("Outcome") or ""
-        citations = row.get("Citations") or ""
-        full_text = row[text_col] if text_col in row else str(row)
-
-        # find scrapped file path if exists
-        local_path = ""
-        candidate_path = os.path.join(SCRAPPED_TEXT_DIR, file_name)
-        if os.path.exists(candidate_path):
-            local_path = os.path.abspath(candidate_path)
-        else:
-            # try file name with .txt
-            p2 = candidate_path if candidate_path.endswith(".txt") else candidate_path + ".txt"
-            if os.path.exists(p2):
-                local_path = os.path.abspath(p2)
-
-        chunks = chunk_text_by_tokens(full_text, chunk_size_tokens=700, overlap_tokens=120)
-        for i, chunk in enumerate(chunks):
-            doc = {
-                "id": f"{file_name}__chunk_{i}",
-                "text": chunk,
-                "metadata": {
-                    "file_name": file_name,
-                    "case_title": case_title,
-                    "court": court,
-                    "case_number": case_number,
-                    "date": date_j,
-                    "judges": judges,
-                    "petitioner": petitioner,
-                    "respondent": respondent,
-                    "legal_issues": legal_issues,
-                    "outcome": outcome,
-                    "citations": citations,
-                    "local_path": local_path  # path to original txt if available
-                }
-            }
-            fout.write(json.dumps(doc, ensure_ascii=False) + "\n")
-            total_chunks += 1
-
-print("Done. Total chunks written:", total_chunks)
-print("Output file:", OUTPUT_JSONL)
+    df = df.drop(index=[idx for idx, name in stored.items() if name in duplicates])
+    print(f"Dropped {before-len(df)} near-duplicate rows.")
+
+    # Prepare chunks and write JSONL
+    print("Chunking texts and writing to", args.output)
+    total_chunks = 0
+    with open(args.output, "w", encoding="utf-8") as fout:
+        for idx, row in tqdm(df.iterrows(), total=len(df)):
+            with metrics.timer("chunk_case_seconds"):
+                docs = row_to_docs(row, idx, text_col)
+            for doc in docs:
+                fout.write(json.dumps(doc, ensure_ascii=False) + "\n")
+                total_chunks += 1
+
+    print("Done. Total chunks written:", total_chunks)
+    print("Output file:", args.output)
+
+if __name__ == "__main__":
+    main()
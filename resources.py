@@ -0,0 +1,107 @@
+# resources.py
+# Lazily constructed, memoized heavy resources shared by the scripts.
+#
+# Nothing expensive happens at import time: the embedding model, Chroma client,
+# Neo4j driver, tokenizer and Gemini model are built on first use and reused for
+# the rest of the process. Connection settings can be overridden with the
+# environment (or a .env file): NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+# CHROMA_DIR, EMBEDDING_MODEL, GEMINI_API_KEY, TEXT_STORE_DIR, HTML_STORE_DIR.
+import os
+import sys
+import glob
+import atexit
+import functools
+
+NEO4J_URI = "neo4j://127.0.0.1:7687"
+NEO4J_USER = "neo4j"
+NEO4J_PASSWORD = "12345678"
+
+PERSIST_DIR = "chroma_index"  # folder where Chroma stores the DB
+COLLECTION_NAME = "legal_cases"
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+GEMINI_MODEL = "gemini-2.0-flash-lite"
+TOKENIZER = "cl100k_base"
+TEXT_STORE_DIR = "corpus_text"   # scraped judgment text (replaces scrappedText/)
+HTML_STORE_DIR = "corpus_html"   # raw judgment HTML (replaces data/)
+LEGACY_TEXT_DIR = "scrappedText"  # one .txt per judgment, before the corpus store
+
+@functools.lru_cache(maxsize=None)
+def load_env():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+def setting(name, default):
+    load_env()
+    return os.getenv(name) or default
+
+@functools.lru_cache(maxsize=None)
+def get_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(setting("EMBEDDING_MODEL", MODEL_NAME))
+
+@functools.lru_cache(maxsize=None)
+def get_chroma_client():
+    import chromadb
+    return chromadb.PersistentClient(path=setting("CHROMA_DIR", PERSIST_DIR))
+
+@functools.lru_cache(maxsize=None)
+def get_collection(name=COLLECTION_NAME):
+    return get_chroma_client().get_or_create_collection(
+        name=name,
+        metadata={"hnsw:space": "cosine"}  # cosine similarity
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_driver():
+    from neo4j import GraphDatabase
+    driver = GraphDatabase.driver(
+        setting("NEO4J_URI", NEO4J_URI),
+        auth=(setting("NEO4J_USER", NEO4J_USER), setting("NEO4J_PASSWORD", NEO4J_PASSWORD)),
+    )
+    atexit.register(driver.close)
+    return driver
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer():
+    """tiktoken encoder, or None when tiktoken is unavailable (callers fall back)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER)
+    except Exception:
+        return None
+
+def _open_store(root):
+    from corpus_store import CorpusStore
+    store = CorpusStore(root)
+    atexit.register(store.close)
+    return store
+
+@functools.lru_cache(maxsize=None)
+def get_text_store():
+    return _open_store(setting("TEXT_STORE_DIR", TEXT_STORE_DIR))
+
+def require_text_store():
+    """
+    The text store, or exit if it is empty while judgments are still in the
+    old scrappedText/ directory (running on it would look like every case
+    was deleted).
+    """
+    store = get_text_store()
+    legacy = glob.glob(os.path.join(LEGACY_TEXT_DIR, "*.txt"))
+    if not len(store) and legacy:
+        sys.exit(f"{store.root} is empty but {LEGACY_TEXT_DIR}/ has {len(legacy)} judgments. "
+                 f"Migrate them first:\n  python corpus_store.py migrate {LEGACY_TEXT_DIR} {store.root}")
+    return store
+
+@functools.lru_cache(maxsize=None)
+def get_html_store():
+    return _open_store(setting("HTML_STORE_DIR", HTML_STORE_DIR))
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_model():
+    import google.generativeai as genai
+    genai.configure(api_key=setting("GEMINI_API_KEY", ""))
+    return genai.GenerativeModel(GEMINI_MODEL)
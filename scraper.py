@@ -1,19 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
-import sys
+import argparse
 import re
 import time
-import html2text
-import os
 import zlib
 import gzip
+import metrics
+from resources import get_text_store
+# requests, bs4, html2text and brotli are imported where they are used, so the
+# module (and --help) loads instantly
 
-# optional brotli support
-try:
-    import brotli
-    _HAS_BROTLI = True
-except Exception:
-    _HAS_BROTLI = False
+
+def _brotli():
+    """The brotli module, or None when it is not installed (optional support)."""
+    try:
+        import brotli
+        return brotli
+    except Exception:
+        return None
 
 # --- Configuration ---
 base_url = "https://indiankanoon.org"
@@ -50,7 +52,8 @@ def get_decoded_html(response):
 
     # brotli
     if 'br' in ce:
-        if not _HAS_BROTLI:
+        brotli = _brotli()
+        if brotli is None:
             raise RuntimeError("Server used brotli (br). Install 'brotli' (pip install brotli).")
         try:
             return brotli.decompress(content).decode(response.encoding or 'utf-8', errors='replace')
@@ -87,10 +90,14 @@ def extract_numbers_from_page(page_num):
     Returns:
         list: A list of unique numbers extracted from the URLs, or an empty list on error.
     """
+    import requests
+    from bs4 import BeautifulSoup
+
     target_url = f"{base_url}/search/?formInput={search_query}&pagenum={page_num}"
     print(f"Attempting to fetch URL: {target_url}")
     try:
-        response = requests.get(target_url, headers=headers, timeout=10)
+        with metrics.timer("http_get_seconds", page="search"):
+            response = requests.get(target_url, headers=headers, timeout=10)
         response.raise_for_status()
         print("Successfully fetched HTML content.")
         html_content = get_decoded_html(response)
@@ -127,40 +134,53 @@ def extract_numbers_from_page(page_num):
     return []
 
 
-def html_to_text(url, output_folder="scrappedText"):
+def html_to_text(url, store=None):
     """
     Fetches the HTML content from the given URL, converts it to plain text,
-    and saves the text to a file in the specified folder.
+    and saves the text to the corpus store under "<doc id>.txt".
 
     Args:
         url (str): The URL to fetch.
-        output_folder (str, optional): The name of the folder to save the text file in.
-            Defaults to "scrappedText".
+        store (CorpusStore, optional): The store to save the text in.
+            Defaults to the shared text store (see resources.py).
     """
+    import requests
+    import html2text
+
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        with metrics.timer("http_get_seconds", page="doc"):
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         html_content = get_decoded_html(response)
         h = html2text.HTML2Text()
         h.ignore_links = True
         text = h.handle(html_content)
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+        if store is None:
+            store = get_text_store()
         filename = f"{url.split('/')[-2]}.txt"
-        filepath = os.path.join(output_folder, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(text)
-        print(f"Successfully saved text from {url} to {filepath}")
+        store.put(filename, text)
+        store.flush()
+        print(f"Successfully saved text from {url} to {store.root} as {filename}")
+        metrics.incr("docs_saved_total")
     except requests.exceptions.RequestException as e:
         print(f"Error fetching URL {url}: {e}")
+        metrics.incr("http_failures_total", page="doc")
     except OSError as e:
-        print(f"Error creating directory or writing file: {e}")
+        print(f"Error writing to the corpus store: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
 
-if __name__ == "__main__":
-    for page_num in range(start_page, end_page + 1):
+def main():
+    global search_query
+    parser = argparse.ArgumentParser(description="Scrape judgments from indiankanoon.org.")
+    parser.add_argument("--query", default=search_query, help="search query")
+    parser.add_argument("--start-page", type=int, default=start_page)
+    parser.add_argument("--end-page", type=int, default=end_page)
+    args = parser.parse_args()
+    search_query = args.query
+
+    for page_num in range(args.start_page, args.end_page + 1):
         doc_ids = extract_numbers_from_page(page_num)
         if doc_ids:
             for doc_id in doc_ids:
@@ -171,3 +191,7 @@ if __name__ == "__main__":
             time.sleep(20)
         else:
             print(f"No document IDs found on page {page_num}.")
+
+
+if __name__ == "__main__":
+    main()
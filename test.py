@@ -1,7 +1,7 @@
 import csv
-from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os
+from neo import split_judges, split_issues
 
 load_dotenv()
 
@@ -9,9 +9,7 @@ URI = os.getenv("NEO4J_URI")
 USER = os.getenv("NEO4J_USER")
 PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
-
-def load_cases_into_neo4j(csv_file):
+def load_cases_into_neo4j(csv_file, driver):
     with driver.session() as session:
         with open(csv_file, encoding="utf-8") as f:
             reader = csv.DictReader(f)
@@ -31,8 +29,8 @@ def create_case_graph(tx, row):
         MERGE (court:Court {name: $CourtName})
         MERGE (c)-[:HEARD_IN]->(court)
 
-        FOREACH (judge IN split($Judges, ";") |
-            MERGE (j:Judge {name: trim(judge)})
+        FOREACH (judge IN $Judges |
+            MERGE (j:Judge {name: judge})
             MERGE (c)-[:JUDGED_BY]->(j)
         )
 
@@ -46,8 +44,8 @@ def create_case_graph(tx, row):
             MERGE (c)-[:AGAINST]->(r)
         )
 
-        FOREACH (issue IN split($LegalIssues, ";") |
-            MERGE (i:LegalIssue {description: trim(issue)})
+        FOREACH (issue IN $LegalIssues |
+            MERGE (i:LegalIssue {description: issue})
             MERGE (c)-[:ABOUT]->(i)
         )
     """, 
@@ -56,14 +54,21 @@ def create_case_graph(tx, row):
     CourtName=row["Court Name"],
     DateOfJudgment=row["Date of Judgment"],
     CaseNumber=row["Case Number"],
-    Judges=row["Judges"],
+    Judges=split_judges(row["Judges"]),
     Petitioners=row["Petitioner(s)"],
     Respondents=row["Respondent(s)"],
-    LegalIssues=row["Legal Issues"],
+    LegalIssues=split_issues(row["Legal Issues"]),
     DecisionSummary=row["Decision Summary"],
     Outcome=row["Outcome"],
     Citations=row["Citations"])
 
 # Run the loader
-load_cases_into_neo4j("extracted_cases_clean.csv")
-driver.close()
+def main():
+    from neo4j import GraphDatabase
+
+    driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+    load_cases_into_neo4j("extracted_cases_clean.csv", driver)
+    driver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import hashlib
+
+import pytest
+
+from corpus_store import CorpusStore, CODEC_GZIP, INDEX_FILE, migrate
+
+def test_round_trip(tmp_path):
+    with CorpusStore(str(tmp_path / "store"), codec=CODEC_GZIP) as store:
+        assert store.put("a.txt", "first judgment")
+        assert store.put("b.txt", "second judgment ✓")
+    store = CorpusStore(str(tmp_path / "store"))
+    assert store.get("a.txt") == "first judgment"
+    assert store.get("b.txt") == "second judgment ✓"
+    assert store.get("missing.txt") is None
+    assert list(store.items()) == [("a.txt", "first judgment"), ("b.txt", "second judgment ✓")]
+    assert len(store) == 2 and "a.txt" in store
+
+def test_read_after_write_without_flush(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"), codec=CODEC_GZIP)
+    store.put("a.txt", "alpha")
+    assert store.get("a.txt") == "alpha"
+    store.put("b.txt", "beta")
+    assert store.get("b.txt") == "beta"
+    store.close()
+
+def test_truncated_record_raises(tmp_path):
+    root = str(tmp_path / "store")
+    with CorpusStore(root, codec=CODEC_GZIP) as store:
+        store.put("a.txt", "alpha " * 100)
+    segment = os.path.join(root, "segment-000000.seg")
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 10)
+    with pytest.raises(IOError):
+        CorpusStore(root).get("a.txt")
+
+def test_overwrite_keeps_latest(tmp_path):
+    root = str(tmp_path / "store")
+    with CorpusStore(root, codec=CODEC_GZIP) as store:
+        store.put("a.txt", "v1")
+        assert not store.put("a.txt", "v1")  # unchanged
+        assert store.put("a.txt", "v2")
+        assert store.get("a.txt") == "v2"
+    store = CorpusStore(root)
+    assert store.get("a.txt") == "v2"
+    assert store.digests() == {"a.txt": hashlib.sha1(b"v2").hexdigest()}
+
+def test_delete_writes_tombstone(tmp_path):
+    root = str(tmp_path / "store")
+    with CorpusStore(root, codec=CODEC_GZIP) as store:
+        store.put("a.txt", "alpha")
+        store.put("b.txt", "beta")
+        store.delete("a.txt")
+        assert "a.txt" not in store
+    assert CorpusStore(root).ids() == ["b.txt"]
+
+def test_rebuild_index(tmp_path):
+    root = str(tmp_path / "store")
+    with CorpusStore(root, codec=CODEC_GZIP, segment_size=64) as store:
+        for i in range(5):
+            store.put(f"{i}.txt", f"judgment {i} " * 10)
+        store.put("1.txt", "rewritten")
+        store.delete("3.txt")
+    os.remove(os.path.join(root, INDEX_FILE))
+
+    store = CorpusStore(root)  # rebuilds from the segments
+    assert len(store._segments()) > 1
+    assert sorted(store.ids()) == ["0.txt", "1.txt", "2.txt", "4.txt"]
+    assert store.get("1.txt") == "rewritten"
+    assert store.digests()["1.txt"] == hashlib.sha1(b"rewritten").hexdigest()
+    assert not store.put("1.txt", "rewritten")
+
+def test_compact(tmp_path):
+    root = str(tmp_path / "store")
+    store = CorpusStore(root, codec=CODEC_GZIP)
+    store.put("a.txt", "alpha " * 200)
+    store.put("a.txt", "alpha v2")
+    store.put("b.txt", "beta")
+    store.delete("b.txt")
+    store.flush()
+    before = os.path.getsize(os.path.join(root, "segment-000000.seg"))
+    store.compact()
+    assert os.path.getsize(os.path.join(root, "segment-000000.seg")) < before
+    assert dict(store.items()) == {"a.txt": "alpha v2"}
+    assert dict(CorpusStore(root).items()) == {"a.txt": "alpha v2"}
+    store.close()
+
+def test_migrate_deletes_sources_after_import(tmp_path):
+    src = tmp_path / "scrappedText"
+    src.mkdir()
+    for name in ("1.txt", "2.txt"):
+        (src / name).write_text(f"text of {name}", encoding="utf-8")
+    migrate(str(src), str(tmp_path / "store"), delete=True)
+    assert os.listdir(src) == []
+    store = CorpusStore(str(tmp_path / "store"))
+    assert store.get("2.txt") == "text of 2.txt"
@@ -0,0 +1,75 @@
+import random
+
+from corpus_store import CorpusStore, CODEC_GZIP
+from dedup import NearDuplicateIndex, find_near_duplicates, find_corpus_duplicates, shingles
+
+WORDS = ("court appellant respondent petitioner held section order decree appeal maintenance "
+         "divorce wife husband evidence magistrate learned counsel impugned application criminal "
+         "civil procedure desertion cruelty custody alimony marriage record finding trial").split()
+
+def judgment(seed, words=600):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def test_near_duplicate_is_found():
+    text = judgment(1)
+    copy = "IN THE HIGH COURT OF JUDICATURE AT BOMBAY " + text.replace("wife", "spouse", 3)
+    duplicates = find_near_duplicates({"a.txt": text, "b.txt": judgment(2), "c.txt": copy})
+    assert duplicates == {"c.txt": "a.txt"}
+
+def test_short_boilerplate_is_not_a_duplicate():
+    assert find_near_duplicates({"a": "Appeal dismissed.", "b": "Appeal dismissed."}) == {}
+
+def test_minimum_shingle_count():
+    index = NearDuplicateIndex(min_shingles=10)
+    assert index.signature("one two three four five six") is None
+    assert index.signature(judgment(3, words=20)) is not None
+    assert len(shingles(judgment(3, words=20))) >= 10
+
+def test_update_only_reads_changed_texts(tmp_path):
+    index = NearDuplicateIndex()
+    texts = {"a": judgment(1), "b": judgment(2)}
+    index.sync(texts)
+    read = []
+    hashes = dict(index.text_hashes, c="new-hash")
+    index.update(hashes, lambda key: read.append(key) or judgment(1))
+    assert read == ["c"]
+    assert index.duplicates() == {"c": "a"}
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = NearDuplicateIndex.load(path)
+    assert loaded.duplicates() == {"c": "a"}
+    assert loaded.text_hashes == index.text_hashes
+
+def test_find_corpus_duplicates(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"), codec=CODEC_GZIP)
+    text = judgment(7)
+    store.put("13379025.txt", text)
+    store.put("other.txt", judgment(8))
+    store.put("15795585.txt", text + " WITH SECOND APPEAL NO.621 OF 2014")
+    index_file = str(tmp_path / "near_duplicates.npz")
+    assert find_corpus_duplicates(store, index_file=index_file) == {"15795585.txt": "13379025.txt"}
+    # limited to the requested IDs
+    assert find_corpus_duplicates(store, ["other.txt", "15795585.txt"], index_file=index_file) == {}
+    store.close()
+
+def test_canonical_survives_rewrite(tmp_path):
+    store = CorpusStore(str(tmp_path / "store"), codec=CODEC_GZIP)
+    text = judgment(9)
+    store.put("0.txt", text)
+    store.put("dup.txt", text + " certified copy")
+    index_file = str(tmp_path / "near_duplicates.npz")
+    assert find_corpus_duplicates(store, index_file=index_file) == {"dup.txt": "0.txt"}
+    # re-scraping the canonical copy moves it to the end of the store
+    store.put("0.txt", text + " footer")
+    assert find_corpus_duplicates(store, index_file=index_file) == {"dup.txt": "0.txt"}
+    store.close()
+
+def test_signature_is_independent_of_block_size(monkeypatch):
+    import dedup
+    index = NearDuplicateIndex()
+    text = judgment(10, words=3000)
+    whole = index.signature(text)
+    monkeypatch.setattr(dedup, "HASH_BLOCK", 7)
+    assert (index.signature(text) == whole).all()